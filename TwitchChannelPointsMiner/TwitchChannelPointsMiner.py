@@ -9,15 +9,19 @@ import threading
 import time
 import uuid
 from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
 
+from TwitchChannelPointsMiner.classes.Clock import Clock
 from TwitchChannelPointsMiner.classes.entities.PubsubTopic import PubsubTopic
 from TwitchChannelPointsMiner.classes.entities.Streamer import (
     Streamer,
     StreamerSettings,
 )
 from TwitchChannelPointsMiner.classes.Exceptions import StreamerDoesNotExistException
-from TwitchChannelPointsMiner.classes.Settings import Settings
+from TwitchChannelPointsMiner.classes.PubSubRecorder import PubSubRecorder
+from TwitchChannelPointsMiner.classes.Settings import Priority, Settings
+from TwitchChannelPointsMiner.classes.StreamersIndex import StreamersIndex
 from TwitchChannelPointsMiner.classes.Twitch import Twitch
 from TwitchChannelPointsMiner.classes.TwitchBrowser import (
     BrowserSettings,
@@ -45,6 +49,18 @@ class TwitchChannelPointsMiner:
         self,
         username: str,
         claim_drops_startup: bool = False,
+        # Chain of priorities for choose the 2 streamers to watch (see Priority)
+        priority: list = [Priority.STREAK, Priority.ORDER],
+        # Filename where the raw PubSub traffic is recorded (replay it with benchmarks/pubsub_replay.py)
+        pubsub_recorder: str = None,
+        # Seconds before the spade url (minute watched endpoint) is discovered again
+        spade_url_ttl: int = 3600,
+        # Max GQL operations sent in a single (batched) request
+        gql_max_batch_size: int = 30,
+        # Requests per second for each EndpointFamily (GQL, HELIX, SPADE), the missing ones keep the default
+        rate_limits: dict = None,
+        # Threads that send the GQL requests, by priority (claims first)
+        gql_workers: int = 4,
         # Settings for logging and selenium as you can see.
         # This settings will be global shared trought Settings class
         logger_settings: LoggerSettings = LoggerSettings(),
@@ -64,11 +80,21 @@ class TwitchChannelPointsMiner:
         Settings.streamer_settings = streamer_settings
 
         user_agent = get_user_agent(browser_settings.browser)
-        self.twitch = Twitch(self.username, user_agent)
+        self.twitch = Twitch(
+            self.username,
+            user_agent,
+            rate_limits=rate_limits,
+            gql_max_batch_size=gql_max_batch_size,
+            spade_url_ttl=spade_url_ttl,
+            gql_workers=gql_workers,
+        )
 
         self.twitch_browser = None
         self.claim_drops_startup = claim_drops_startup
+        self.priority = priority if isinstance(priority, list) else [priority]
+        self.pubsub_recorder = pubsub_recorder
         self.streamers = []
+        self.streamers_index = StreamersIndex()
         self.events_predictions = {}
         self.minute_watcher_thread = None
         self.ws_pool = None
@@ -133,41 +159,22 @@ class TwitchChannelPointsMiner:
                 f"Loading data for {len(streamers_name)} streamers. Please wait...",
                 extra={"emoji": ":nerd_face:"},
             )
+            channel_ids = self.twitch.get_channel_ids(streamers_name)
             for username in streamers_name:
-                time.sleep(random.uniform(0.3, 0.7))
                 try:
+                    if username not in channel_ids:
+                        raise StreamerDoesNotExistException
 
-                    if isinstance(streamers_dict[username], Streamer) is True:
-                        streamer = streamers_dict[username]
-                    else:
-                        streamer = Streamer(username)
-
-                    streamer.channel_id = self.twitch.get_channel_id(username)
-                    streamer.settings = set_default_settings(
-                        streamer.settings, Settings.streamer_settings
+                    self.__append_streamer(
+                        streamers_dict[username], channel_ids[username]
                     )
-                    streamer.settings.bet = set_default_settings(
-                        streamer.settings.bet, Settings.streamer_settings.bet
-                    )
-
-                    self.streamers.append(streamer)
                 except StreamerDoesNotExistException:
                     logger.info(
                         f"Streamer {username} does not exist",
                         extra={"emoji": ":cry:"},
                     )
 
-            # Populate the streamers with default values.
-            # 1. Load channel points and auto-claim bonus
-            # 2. Check if streamers is online
-            # 3. Check if the user is a Streamer. In thi case you can't do prediction
-            for streamer in self.streamers:
-                time.sleep(random.uniform(0.3, 0.7))
-                self.twitch.load_channel_points_context(streamer)
-                self.twitch.check_streamer_online(streamer)
-                self.twitch.viewer_is_mod(streamer)
-                if streamer.viewer_is_mod is True:
-                    streamer.settings.make_predictions = False
+            self.__load_streamers_data()
 
             self.original_streamers = copy.deepcopy(self.streamers)
 
@@ -186,12 +193,7 @@ class TwitchChannelPointsMiner:
 
             self.minute_watcher_thread = threading.Thread(
                 target=self.twitch.send_minute_watched_events,
-                args=(
-                    self.streamers,
-                    at_least_one_value_in_settings_is(
-                        self.streamers, "watch_streak", True
-                    ),
-                ),
+                args=(self.streamers, self.priority),
             )
             self.minute_watcher_thread.start()
 
@@ -199,7 +201,13 @@ class TwitchChannelPointsMiner:
                 twitch=self.twitch,
                 browser=self.twitch_browser,
                 streamers=self.streamers,
+                streamers_index=self.streamers_index,
                 events_predictions=self.events_predictions,
+                recorder=(
+                    PubSubRecorder(self.pubsub_recorder)
+                    if self.pubsub_recorder is not None
+                    else None
+                ),
             )
 
             # Subscribe to community-points-user. Get update for points spent or gains
@@ -222,6 +230,11 @@ class TwitchChannelPointsMiner:
                         user_id=self.twitch.twitch_login.get_user_id(),
                     )
                 )
+                # Campaigns in progress, used by Priority.DROPS for choose the streams to watch
+                try:
+                    self.twitch.load_drops_campaigns()
+                except Exception:
+                    logger.error("Failed to load the drops campaigns", exc_info=True)
 
             # Going to subscribe to predictions-user-v1. Get update when we place a new prediction (confirm)
             if make_predictions is True:
@@ -232,27 +245,120 @@ class TwitchChannelPointsMiner:
                     )
                 )
 
-            for streamer in self.streamers:
-                self.ws_pool.submit(
-                    PubsubTopic("video-playback-by-id", streamer=streamer)
+            # The topics are grouped in few LISTEN frames for each connection
+            self.ws_pool.submit_topics(
+                [
+                    topic
+                    for streamer in self.streamers
+                    for topic in self.__streamer_topics(streamer)
+                ]
+            )
+
+            while self.running:
+                Clock.sleep(random.uniform(20, 60))
+                # Refresh the stream info of the online streamers (and the ones queued by the viewcount messages)
+                # with batched requests
+                self.twitch.check_streamers_online(
+                    [streamer for streamer in self.streamers if streamer.is_online]
                 )
+                # Do an external control for each WebSocket. Check if the ping thread is running
+                self.ws_pool.check_connections()
+
+    # Add a streamer while the miner is running. The streamer can be a String -> username or Streamer instance
+    def add_streamer(self, streamer):
+        username = (
+            streamer.username
+            if isinstance(streamer, Streamer)
+            else streamer.lower().strip()
+        )
+        if self.streamers_index.get_by_username(username) is not None:
+            logger.info(f"Streamer {username} is already mined")
+            return
 
-                if streamer.settings.follow_raid is True:
-                    self.ws_pool.submit(PubsubTopic("raid", streamer=streamer))
+        try:
+            streamer = self.__append_streamer(
+                streamer, self.twitch.get_channel_id(username)
+            )
+        except StreamerDoesNotExistException:
+            logger.info(f"Streamer {username} does not exist", extra={"emoji": ":cry:"})
+            return
+
+        self.twitch.load_streamers_data([streamer])
+        self.twitch.watch_scheduler.add(streamer)
+        self.original_streamers.append(copy.deepcopy(streamer))
+        if self.ws_pool is not None:
+            self.ws_pool.submit_topics(self.__streamer_topics(streamer))
+
+    # Remove a streamer while the miner is running. The PubSub messages for this channel will be ignored
+    def remove_streamer(self, username):
+        streamer = self.streamers_index.get_by_username(username)
+        if streamer is not None:
+            self.streamers_index.remove(streamer)
+            self.streamers.remove(streamer)
+            self.twitch.watch_scheduler.remove(streamer)
+
+    def __append_streamer(self, streamer, channel_id):
+        if isinstance(streamer, Streamer) is False:
+            streamer = Streamer(streamer)
+
+        streamer.channel_id = channel_id
+        streamer.settings = set_default_settings(
+            streamer.settings, Settings.streamer_settings
+        )
+        streamer.settings.bet = set_default_settings(
+            streamer.settings.bet, Settings.streamer_settings.bet
+        )
 
-                if streamer.settings.make_predictions is True:
-                    self.ws_pool.submit(
-                        PubsubTopic("predictions-channel-v1", streamer=streamer)
+        self.streamers.append(streamer)
+        self.streamers_index.add(streamer)
+        return streamer
+
+    def __streamer_topics(self, streamer):
+        topics = [PubsubTopic("video-playback-by-id", streamer=streamer)]
+
+        if streamer.settings.follow_raid is True:
+            topics.append(PubsubTopic("raid", streamer=streamer))
+
+        # We need a browser to make predictions / bet
+        if (
+            streamer.settings.make_predictions is True
+            and self.twitch_browser is not None
+        ):
+            topics.append(PubsubTopic("predictions-channel-v1", streamer=streamer))
+        return topics
+
+    # Load channel points, online status and mod status for all the streamers.
+    # Each worker send a chunk of streamers as a single batched GQL request (3 operations for each streamer).
+    # The requests run on a bounded pool of workers, the pace is given by the Twitch rate limiter
+    def __load_streamers_data(self, max_workers=8):
+        chunk_size = max(1, self.twitch.gql_max_batch_size // 3)
+        chunks = [
+            self.streamers[index : index + chunk_size]
+            for index in range(0, len(self.streamers), chunk_size)
+        ]
+
+        loaded = 0
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {
+                executor.submit(self.twitch.load_streamers_data, chunk): chunk
+                for chunk in chunks
+            }
+            for future in as_completed(futures):
+                try:
+                    future.result()
+                except Exception:
+                    logger.error(
+                        f"Exception raised while loading data for {futures[future]}",
+                        exc_info=True,
                     )
-
-            while self.running:
-                time.sleep(random.uniform(20, 60))
-                # Do an external control for WebSocket. Check if the thread is running
-                if self.ws_pool.ws.elapsed_last_ping() > 5:
+                # Report the progress every 10%
+                previous_step = (loaded * 10) // len(self.streamers)
+                loaded += len(futures[future])
+                if (loaded * 10) // len(self.streamers) > previous_step:
                     logger.info(
-                        "The last ping was sent more than 5 minutes ago. Reconnecting to the WebSocket..."
+                        f"Loaded data for {loaded}/{len(self.streamers)} streamers",
+                        extra={"emoji": ":hourglass_flowing_sand:"},
                     )
-                    WebSocketsPool.handle_websocket_reconnection(self.ws_pool.ws)
 
     def end(self, signum, frame):
         logger.info("CTRL+C Detected! Please wait just a moments!")
@@ -284,6 +390,40 @@ class TwitchChannelPointsMiner:
             extra={"emoji": ":hourglass:"},
         )
 
+        for host, stats in self.twitch.http.stats().items():
+            logger.debug(
+                f"HTTP pool {host} - Requests: {stats['requests']}, Connections opened: {stats['connections']}, Reused: {stats['reused']}"
+            )
+        if self.ws_pool is not None:
+            for family, stats in self.ws_pool.dispatcher.stats().items():
+                logger.debug(
+                    f"PubSub {family} messages: {stats['processed']}, Dropped: {stats['dropped']}, Queue depth: {stats['queue_depth']}, Avg wait: {stats['avg_wait']}s, Avg handler latency: {stats['avg_latency']}s, Max: {stats['max_latency']}s"
+                )
+            stats = self.ws_pool.decoder.stats()
+            logger.debug(
+                f"PubSub messages decoded: {stats['decoded']}, Skipped before decoding: {stats['skipped']} ({round(stats['skip_rate'] * 100, 2)}%)"
+            )
+            stats = self.ws_pool.dedup.stats()
+            logger.debug(
+                f"PubSub duplicated messages suppressed: {stats['hits']}, Hit rate: {round(stats['hit_rate'] * 100, 2)}%, Cache size: {stats['size']}"
+            )
+            stats = self.ws_pool.reconnect_scheduler.stats()
+            logger.debug(
+                f"PubSub reconnections: {stats['reconnections']}, Avg gap: {stats['avg_gap']}s, Max gap: {stats['max_gap']}s"
+            )
+            for index, stats in self.ws_pool.listen_stats().items():
+                logger.debug(
+                    f"PubSub connection #{index} - LISTEN frames acked: {stats['acked']}, Pending: {stats['pending']}, Failed: {stats['failed']}, Avg ack latency: {stats['avg_latency']}s, Max: {stats['max_latency']}s"
+                )
+        stats = self.twitch.refresh_coordinator.stats()
+        logger.debug(
+            f"Stream info refreshes: {stats['refreshed']} in {stats['batches']} batches, Viewcount triggers: {stats['triggers']}, Avoided: {stats['avoided']} ({round(stats['avoided_rate'] * 100, 2)}%)"
+        )
+        for priority, stats in self.twitch.scheduler.stats().items():
+            logger.debug(
+                f"GQL {priority} requests: {stats['count']}, Retries: {stats['retries']}, Avg wait in queue: {stats['avg_wait']}s, Max wait: {stats['max_wait']}s"
+            )
+
         for event_id in self.events_predictions:
             if (
                 self.events_predictions[event_id].bet_confirmed is True
@@ -300,13 +440,16 @@ class TwitchChannelPointsMiner:
                 )
         print("")
 
-        for streamer_index in range(0, len(self.streamers)):
+        original_streamers = {
+            streamer.username: streamer for streamer in self.original_streamers
+        }
+        for streamer in self.streamers:
             logger.info(
-                f"{repr(self.streamers[streamer_index])}, Total Points Gained (after farming - before farming): {_millify(self.streamers[streamer_index].channel_points - self.original_streamers[streamer_index].channel_points)}",
+                f"{repr(streamer)}, Total Points Gained (after farming - before farming): {_millify(streamer.channel_points - original_streamers[streamer.username].channel_points)}",
                 extra={"emoji": ":robot:"},
             )
-            if self.streamers[streamer_index].history != {}:
+            if streamer.history != {}:
                 logger.info(
-                    f"{self.streamers[streamer_index].print_history()}",
+                    f"{streamer.print_history()}",
                     extra={"emoji": ":moneybag:"},
                 )
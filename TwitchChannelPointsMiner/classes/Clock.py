@@ -0,0 +1,25 @@
+import time
+
+
+class Clock:
+    """
+    Time source of the package (class attributes, shared as Settings).
+    By default the system clock, a simulation can install a VirtualClock with Clock.use(...).
+    """
+
+    source = None
+
+    @classmethod
+    def use(cls, source=None):
+        cls.source = source
+
+    @classmethod
+    def time(cls) -> float:
+        return time.time() if cls.source is None else cls.source.time()
+
+    @classmethod
+    def sleep(cls, seconds: float):
+        if cls.source is None:
+            time.sleep(seconds)
+        else:
+            cls.source.sleep(seconds)
@@ -0,0 +1,49 @@
+import threading
+from collections import OrderedDict
+
+from TwitchChannelPointsMiner.classes.Clock import Clock
+
+
+class DedupCache:
+    """
+    Bounded LRU of the keys already seen (shared by all the PubSub connections).
+    A key is a duplicate if it was seen less than `ttl` seconds ago, the memory is fixed to `max_size` keys.
+    """
+
+    def __init__(self, max_size: int = 10000, ttl: float = 600):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def seen(self, key) -> bool:
+        now = Clock.time()
+        with self.lock:
+            # The entries are in insertion order, drop the expired ones from the head
+            while self.entries != {}:
+                oldest_key, inserted_at = next(iter(self.entries.items()))
+                if now - inserted_at < self.ttl:
+                    break
+                del self.entries[oldest_key]
+
+            if key in self.entries:
+                self.hits += 1
+                return True
+
+            self.misses += 1
+            self.entries[key] = now
+            if len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+            return False
+
+    def stats(self) -> dict:
+        with self.lock:
+            total = self.hits + self.misses
+            return {
+                "size": len(self.entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 4) if total > 0 else 0,
+            }
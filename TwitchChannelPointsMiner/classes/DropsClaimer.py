@@ -0,0 +1,110 @@
+import json
+import logging
+import os
+import queue
+import random
+import threading
+
+from TwitchChannelPointsMiner.classes.Clock import Clock
+
+logger = logging.getLogger(__name__)
+
+
+class DropsClaimer:
+    """
+    Claim the drops in background: submit() returns immediately, a worker claims one drop at a time with a pause
+    between two claims and a few retries if the claim fails.
+    The claimed drop instance ids are saved in a json file, a drop is never claimed twice (also between restarts).
+    workers=0: claimed by the caller as the RequestScheduler, without pauses.
+    """
+
+    def __init__(
+        self, claim, filename=None, delay=(5, 10), retries=3, workers: int = 1
+    ):
+        # claim(drop_instance_id, streamer) -> True if claimed
+        self.claim = claim
+        self.filename = filename
+        self.delay = delay
+        self.retries = retries
+        self.workers = workers
+        self.queue = queue.Queue()
+        self.lock = threading.Lock()
+        self.pending = set()
+        self.claimed = self.__load()
+
+        for index in range(0, workers):
+            thread = threading.Thread(
+                target=self.__worker, name=f"DropsClaimer-{index}"
+            )
+            thread.daemon = True
+            thread.start()
+
+    def __load(self):
+        if self.filename is None or os.path.isfile(self.filename) is False:
+            return set()
+        try:
+            with open(self.filename, "r", encoding="utf-8") as f:
+                return set(json.load(f))
+        except (OSError, ValueError):
+            logger.error(f"Unable to read {self.filename}", exc_info=True)
+            return set()
+
+    def __save(self):
+        if self.filename is None:
+            return
+        temporary = f"{self.filename}.tmp"
+        with open(temporary, "w", encoding="utf-8") as f:
+            json.dump(sorted(self.claimed), f)
+        os.replace(temporary, self.filename)
+
+    # Return False if the drop was already claimed or is waiting to be claimed
+    def submit(self, drop_instance_id, streamer=None) -> bool:
+        with self.lock:
+            if drop_instance_id in self.claimed or drop_instance_id in self.pending:
+                return False
+            self.pending.add(drop_instance_id)
+        if self.workers == 0:
+            self.__process(drop_instance_id, streamer)
+        else:
+            self.queue.put((drop_instance_id, streamer))
+        return True
+
+    def __worker(self):
+        while True:
+            drop_instance_id, streamer = self.queue.get()
+            self.__process(drop_instance_id, streamer)
+            self.queue.task_done()
+            # Don't claim all the drops in the same second
+            if self.queue.empty() is False:
+                Clock.sleep(random.uniform(*self.delay))
+
+    def __process(self, drop_instance_id, streamer):
+        claimed = False
+        for attempt in range(0, self.retries):
+            try:
+                claimed = self.claim(drop_instance_id, streamer) is True
+            except Exception:
+                logger.error(
+                    f"Exception raised claiming the drop {drop_instance_id}",
+                    exc_info=True,
+                )
+            if claimed is True or attempt == self.retries - 1:
+                break
+            if self.workers > 0:
+                Clock.sleep(2**attempt * self.delay[0])
+
+        with self.lock:
+            self.pending.discard(drop_instance_id)
+            if claimed is True:
+                self.claimed.add(drop_instance_id)
+                try:
+                    self.__save()
+                except OSError:
+                    logger.error(f"Unable to write {self.filename}", exc_info=True)
+        if claimed is False:
+            logger.error(
+                f"Unable to claim the drop {drop_instance_id} after {self.retries} attempts"
+            )
+
+    def __len__(self):
+        return self.queue.qsize()
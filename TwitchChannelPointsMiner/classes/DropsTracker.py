@@ -0,0 +1,102 @@
+import logging
+import threading
+
+from TwitchChannelPointsMiner.classes.Clock import Clock
+
+logger = logging.getLogger(__name__)
+
+
+class DropsTracker:
+    """
+    Time based drops in progress, read from the Inventory campaigns and kept updated by the drop-progress messages.
+    For a streamer, remaining() is the number of minutes left to the drop (closest to completion)
+    that watching its stream would advance: same game of the campaign and channel allowed by the campaign.
+    """
+
+    def __init__(self, missing_ttl=300):
+        self.lock = threading.Lock()
+        self.drops = {}
+        self.by_game = {}
+        self.loaded = False
+        # Drops with progress but not in the inventory: don't read it again for each progress message
+        self.missing_ttl = missing_ttl
+        self.missing = {}
+
+    def load(self, inventory):
+        drops, by_game = {}, {}
+        for campaign in inventory.get("dropCampaignsInProgress") or []:
+            game = (campaign.get("game") or {}).get("name")
+            channels = (campaign.get("allow") or {}).get("channels")
+            for drop in campaign.get("timeBasedDrops") or []:
+                drops[drop["id"]] = {
+                    "campaign": campaign.get("name", campaign.get("id")),
+                    "game": game.lower() if game is not None else None,
+                    # None = every channel with the game
+                    "channels": (
+                        {str(channel["id"]) for channel in channels}
+                        if channels
+                        else None
+                    ),
+                    "required": drop["requiredMinutesWatched"],
+                    "current": drop["self"]["currentMinutesWatched"],
+                    "claimed": drop["self"]["isClaimed"],
+                }
+                by_game.setdefault(drops[drop["id"]]["game"], []).append(drop["id"])
+
+        with self.lock:
+            self.drops = drops
+            self.by_game = by_game
+            self.loaded = True
+            for drop_id in drops:
+                self.missing.pop(drop_id, None)
+        logger.info(
+            f"Drops in progress: {len(drops)} for {len(by_game)} games",
+            extra={"emoji": ":package:"},
+        )
+
+    # Return False if the drop is unknown (new campaign)
+    def progress(self, drop_id, current, required) -> bool:
+        with self.lock:
+            drop = self.drops.get(drop_id)
+            if drop is None:
+                return False
+            drop["current"] = current
+            drop["required"] = required
+            return True
+
+    def not_found(self, drop_id):
+        with self.lock:
+            self.missing[drop_id] = Clock.time()
+
+    # True if the drop wasn't in an inventory read less than missing_ttl seconds ago
+    def recently_missing(self, drop_id) -> bool:
+        with self.lock:
+            return Clock.time() < self.missing.get(drop_id, 0) + self.missing_ttl
+
+    def remaining(self, streamer):
+        game = streamer.stream.game_name()
+        if game is None:
+            return None
+        remaining = None
+        with self.lock:
+            for drop_id in self.by_game.get(game.lower(), []):
+                drop = self.drops[drop_id]
+                if (
+                    drop["claimed"] is False
+                    and drop["current"] < drop["required"]
+                    and (
+                        drop["channels"] is None
+                        or str(streamer.channel_id) in drop["channels"]
+                    )
+                ):
+                    minutes = drop["required"] - drop["current"]
+                    remaining = (
+                        minutes if remaining is None else min(remaining, minutes)
+                    )
+        return remaining
+
+    def __contains__(self, drop_id):
+        return drop_id in self.drops
+
+    def __len__(self):
+        return len(self.drops)
@@ -0,0 +1,84 @@
+import logging
+import threading
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from TwitchChannelPointsMiner.constants.twitch import API, URL, GQLOperations
+
+logger = logging.getLogger(__name__)
+
+
+class HttpClient:
+    """
+    Keep-alive transport shared by all the threads (GQL, Helix, spade and pages).
+    Every host get its own pool of connections, so the TCP+TLS handshake is done only once per connection.
+    The default headers are set once on the session, the per-request headers (Authorization) are merged by requests.
+    """
+
+    def __init__(self, user_agent, pool_maxsize=10, timeout=30):
+        self.pool_maxsize = pool_maxsize
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.session.headers.update({"User-Agent": user_agent})
+
+        self.adapters = {}
+        self.lock = threading.Lock()
+
+        # The GQL endpoint is the most used (startup loader, claims, refresh), give it a bigger pool
+        self.mount(GQLOperations.url, pool_maxsize=pool_maxsize * 2)
+        self.mount(API)
+        self.mount(URL)
+
+    @staticmethod
+    def origin(url):
+        parsed = urlparse(url)
+        return f"{parsed.scheme}://{parsed.netloc}/"
+
+    # Mount a dedicated pool for the host of the url (the spade host is known only at runtime)
+    def mount(self, url, pool_maxsize=None):
+        origin = self.origin(url)
+        with self.lock:
+            if origin not in self.adapters:
+                adapter = HTTPAdapter(
+                    pool_connections=1,
+                    pool_maxsize=(
+                        pool_maxsize if pool_maxsize is not None else self.pool_maxsize
+                    ),
+                )
+                self.session.mount(origin, adapter)
+                self.adapters[origin] = adapter
+
+    def request(self, method, url, **kwargs):
+        kwargs.setdefault("timeout", self.timeout)
+        return self.session.request(method, url, **kwargs)
+
+    def get(self, url, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request("POST", url, **kwargs)
+
+    # For each host: how many connections were opened and how many requests were sent
+    def stats(self):
+        stats = {}
+        with self.lock:
+            adapters = dict(self.adapters)
+        for origin, adapter in adapters.items():
+            pools = adapter.poolmanager.pools
+            connections = requests_count = 0
+            for key in list(pools.keys()):
+                pool = pools.get(key)
+                if pool is not None:
+                    connections += pool.num_connections
+                    requests_count += pool.num_requests
+            stats[origin] = {
+                "connections": connections,
+                "requests": requests_count,
+                "reused": max(0, requests_count - connections),
+            }
+        return stats
+
+    def close(self):
+        self.session.close()
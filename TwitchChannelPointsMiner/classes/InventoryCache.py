@@ -0,0 +1,97 @@
+import logging
+import threading
+
+from TwitchChannelPointsMiner.classes.Clock import Clock
+
+logger = logging.getLogger(__name__)
+
+
+class InventoryCache:
+    """
+    The Inventory of the drops, fetched once and indexed by drop id (the `self` of each time based drop).
+    The lookups that need a fresher inventory than the cached one (a drop completed after the last fetch) wait for
+    the request in flight instead of sending another one: the drops that complete together need a single Inventory.
+    The inventory expires after `ttl` seconds or when a drop is claimed (invalidate).
+    """
+
+    def __init__(self, fetch, ttl=300):
+        self.fetch = fetch
+        self.ttl = ttl
+        self.condition = threading.Condition()
+        self.inventory = None
+        self.drops = {}
+        # Time of the request of the cached inventory, and of the request in flight (None if nobody is fetching)
+        self.fetched_at = 0
+        self.fetching_at = None
+        self.fetches = 0
+
+    # The inventory requested at or after `not_before` (default: the cached one if not expired)
+    def get(self, not_before=None):
+        with self.condition:
+            # Wait the request in flight, fetch again if it failed or was sent too early
+            while self.__fresh(not_before) is False and self.fetching_at is not None:
+                self.condition.wait()
+            if self.__fresh(not_before) is True:
+                return self.inventory
+            self.fetching_at = Clock.time()
+            requested_at = self.fetching_at
+
+        inventory = None
+        try:
+            inventory = self.fetch()
+        finally:
+            with self.condition:
+                if inventory is not None:
+                    self.__index(inventory, requested_at)
+                self.fetching_at = None
+                self.condition.notify_all()
+        return inventory
+
+    def __fresh(self, not_before):
+        if self.inventory is None:
+            return False
+        if not_before is not None:
+            return self.fetched_at >= not_before
+        return Clock.time() < self.fetched_at + self.ttl
+
+    def __index(self, inventory, requested_at):
+        self.inventory = inventory
+        self.fetched_at = requested_at
+        self.fetches += 1
+        self.drops = {
+            drop["id"]: drop["self"]
+            for campaign in inventory.get("dropCampaignsInProgress") or []
+            for drop in campaign.get("timeBasedDrops") or []
+        }
+        logger.debug(f"Inventory fetched: {len(self.drops)} drops")
+
+    # The `self` of the drop (dropInstanceID, isClaimed, ...), None if it isn't in the inventory
+    def drop(self, drop_id, not_before=None):
+        with self.condition:
+            drop = self.drops.get(drop_id)
+            if (
+                drop is not None
+                and drop["dropInstanceID"] is not None
+                and drop["isClaimed"] is False
+            ):
+                return drop
+        self.get(not_before=not_before)
+        with self.condition:
+            return self.drops.get(drop_id)
+
+    # Every drop that can be claimed now
+    def claimable(self) -> list:
+        self.get()
+        with self.condition:
+            return [
+                drop["dropInstanceID"]
+                for drop in self.drops.values()
+                if drop["dropInstanceID"] is not None and drop["isClaimed"] is False
+            ]
+
+    # A drop was claimed: the next lookup reads the inventory again
+    def invalidate(self):
+        with self.condition:
+            self.inventory = None
+            self.drops = {}
+            self.fetched_at = 0
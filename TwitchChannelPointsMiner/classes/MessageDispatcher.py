@@ -0,0 +1,129 @@
+import logging
+import queue
+import threading
+import time
+import zlib
+
+logger = logging.getLogger(__name__)
+
+# Each family of topics has its own queues and workers,
+# so a slow handler (a bet with the browser) doesn't delay the claims or the raids
+TOPIC_FAMILIES = {
+    "community-points-user-v1": "points",
+    "video-playback-by-id": "playback",
+    "raid": "raid",
+    "predictions-channel-v1": "predictions",
+    "predictions-user-v1": "predictions",
+    "user-drop-events": "drops",
+}
+# The bets share a single browser: the predictions are handled one at a time
+SINGLE_WORKER_FAMILIES = {"predictions"}
+
+
+class MessageDispatcher:
+    """
+    Decouple the websocket receive thread from the handlers.
+    For each topic family there are `workers` bounded queues with a thread each (one for the predictions), the messages
+    of a channel always go in the same queue (hash of the channel_id) so the order is preserved per channel.
+    workers=0: handled by the caller, as the RequestScheduler.
+    """
+
+    def __init__(self, handler, workers: int = 2, max_queue_size: int = 1000):
+        self.handler = handler
+        self.workers = workers
+        self.lock = threading.Lock()
+        self.queues = {}
+        self.stats_by_family = {}
+
+        for family in sorted(set(TOPIC_FAMILIES.values())):
+            self.queues[family] = []
+            self.stats_by_family[family] = {
+                "processed": 0,
+                "dropped": 0,
+                "total_wait": 0,
+                "total_latency": 0,
+                "max_latency": 0,
+            }
+            family_workers = (
+                min(workers, 1) if family in SINGLE_WORKER_FAMILIES else workers
+            )
+            for index in range(0, family_workers):
+                message_queue = queue.Queue(maxsize=max_queue_size)
+                self.queues[family].append(message_queue)
+                thread = threading.Thread(
+                    target=self.__worker,
+                    args=(family, message_queue),
+                    name=f"MessageDispatcher-{family}-{index}",
+                )
+                thread.daemon = True
+                thread.start()
+
+    def dispatch(self, streamer, message):
+        family = TOPIC_FAMILIES.get(message.topic)
+        if family is None:
+            return
+
+        if self.workers == 0:
+            self.__handle(family, time.time(), streamer, message)
+            return
+
+        shard = zlib.crc32(str(message.channel_id).encode("utf-8")) % len(
+            self.queues[family]
+        )
+        try:
+            self.queues[family][shard].put_nowait((time.time(), streamer, message))
+        except queue.Full:
+            with self.lock:
+                self.stats_by_family[family]["dropped"] += 1
+            logger.warning(
+                f"The {family} queue is full, message dropped: {message.identifier}"
+            )
+
+    def __worker(self, family, message_queue):
+        while True:
+            enqueued_at, streamer, message = message_queue.get()
+            self.__handle(family, enqueued_at, streamer, message)
+            message_queue.task_done()
+
+    def __handle(self, family, enqueued_at, streamer, message):
+        started_at = time.time()
+        try:
+            self.handler(streamer, message)
+        except Exception:
+            logger.error(
+                f"Exception raised for topic: {message.topic} and message: {message}",
+                exc_info=True,
+            )
+        latency = time.time() - started_at
+
+        with self.lock:
+            stats = self.stats_by_family[family]
+            stats["processed"] += 1
+            stats["total_wait"] += started_at - enqueued_at
+            stats["total_latency"] += latency
+            stats["max_latency"] = max(stats["max_latency"], latency)
+
+    # For each family: queue depth, processed / dropped messages, avg wait in queue and handler latency (seconds)
+    def stats(self) -> dict:
+        with self.lock:
+            return {
+                family: {
+                    "queue_depth": sum(
+                        message_queue.qsize() for message_queue in self.queues[family]
+                    ),
+                    "processed": stats["processed"],
+                    "dropped": stats["dropped"],
+                    "avg_wait": (
+                        round(stats["total_wait"] / stats["processed"], 3)
+                        if stats["processed"] > 0
+                        else 0
+                    ),
+                    "avg_latency": (
+                        round(stats["total_latency"] / stats["processed"], 3)
+                        if stats["processed"] > 0
+                        else 0
+                    ),
+                    "max_latency": round(stats["max_latency"], 3),
+                }
+                for family, stats in self.stats_by_family.items()
+            }
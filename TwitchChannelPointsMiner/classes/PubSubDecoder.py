@@ -0,0 +1,86 @@
+import re
+import threading
+
+from TwitchChannelPointsMiner.classes.entities.Message import Message
+from TwitchChannelPointsMiner.utils import json_loads
+
+# {"type":"MESSAGE","data":{"topic":"video-playback-by-id.123","message":"{\"type\":\"viewcount\", ...
+# If the frame doesn't look like this (nested type not in first position) it's fully decoded
+MESSAGE_HEADER = re.compile(
+    r'"topic"\s*:\s*"([^".]+)\.([^"]+)"\s*,\s*"message"\s*:\s*"\{\\"type\\"\s*:\s*\\"([^\\"]+)\\"'
+)
+# The header is always at the beginning of the frame, don't scan the whole message
+MESSAGE_HEADER_WINDOW = 512
+
+# Topic -> message types handled by WebSocketsPool.process_message, the others are dropped before decoding
+HANDLED_MESSAGES = {
+    "community-points-user-v1": {"points-earned", "claim-available"},
+    "video-playback-by-id": {"stream-up", "stream-down", "viewcount"},
+    "raid": {"raid_update_v2"},
+    "predictions-channel-v1": {"event-created", "event-updated"},
+    "predictions-user-v1": {"prediction-result", "prediction-made"},
+    "user-drop-events": {"drop-progress"},
+}
+
+
+class PubSubDecoder:
+    """
+    Decode the PubSub frames with the cheapest path: peek the topic and the message type with a regex,
+    drop the messages we don't handle (or the ones rejected by `skip(topic, topic_user, message_type)`)
+    without decoding them, decode the others (orjson if installed) into a lazy Message.
+    """
+
+    def __init__(self, handled_messages: dict = HANDLED_MESSAGES, skip=None):
+        self.handled_messages = handled_messages
+        self.skip = skip
+        self.lock = threading.Lock()
+        self.decoded = 0
+        self.skipped = 0
+
+    @staticmethod
+    def peek(frame):
+        header = MESSAGE_HEADER.search(frame, 0, MESSAGE_HEADER_WINDOW)
+        return header.groups() if header is not None else None
+
+    def handled(self, topic, topic_user, message_type) -> bool:
+        if message_type not in self.handled_messages.get(topic, ()):
+            return False
+        return self.skip is None or self.skip(topic, topic_user, message_type) is False
+
+    # Return the frame type and the payload: a Message (None if dropped) for MESSAGE frames, the decoded frame otherwise
+    def decode(self, frame):
+        header = self.peek(frame)
+        if header is not None and self.handled(*header) is False:
+            self.__count(skipped=True)
+            return "MESSAGE", None
+
+        response = json_loads(frame)
+        if response["type"] != "MESSAGE":
+            return response["type"], response
+
+        message = Message(response["data"])
+        if (
+            header is None
+            and self.handled(message.topic, message.topic_user, message.type) is False
+        ):
+            self.__count(skipped=True)
+            return "MESSAGE", None
+
+        self.__count(skipped=False)
+        return "MESSAGE", message
+
+    def __count(self, skipped):
+        with self.lock:
+            if skipped is True:
+                self.skipped += 1
+            else:
+                self.decoded += 1
+
+    def stats(self) -> dict:
+        with self.lock:
+            total = self.decoded + self.skipped
+            return {
+                "decoded": self.decoded,
+                "skipped": self.skipped,
+                "skip_rate": round(self.skipped / total, 4) if total > 0 else 0,
+            }
@@ -0,0 +1,59 @@
+import gzip
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class PubSubRecorder:
+    """
+    Append-only recording of the raw PubSub frames: one line for each frame, receive timestamp TAB frame
+    (the frames are JSON, without newlines). If the filename ends with .gz the file is gzip compressed.
+    Read it with PubSubRecorder.read and replay it with benchmarks/pubsub_replay.py.
+    """
+
+    def __init__(self, filename: str):
+        self.filename = filename
+        self.lock = threading.Lock()
+        self.frames = 0
+        self.file = self.__open(filename, "at")
+        logger.info(
+            f"Recording the PubSub traffic in: {filename}",
+            extra={"emoji": ":page_facing_up:"},
+        )
+
+    @staticmethod
+    def __open(filename, mode):
+        return (
+            gzip.open(filename, mode, encoding="utf-8")
+            if filename.endswith(".gz")
+            else open(filename, mode, encoding="utf-8")
+        )
+
+    def record(self, frame: str, received_at: float = None):
+        received_at = time.time() if received_at is None else received_at
+        line = f"{received_at:.6f}\t{frame.strip()}\n"
+        with self.lock:
+            if self.file is not None:
+                self.file.write(line)
+                self.frames += 1
+
+    def close(self):
+        with self.lock:
+            if self.file is not None:
+                self.file.close()
+                self.file = None
+        logger.info(
+            f"{self.frames} PubSub frames recorded in: {self.filename}",
+            extra={"emoji": ":page_facing_up:"},
+        )
+
+    # Generator of (received_at, frame)
+    @staticmethod
+    def read(filename: str):
+        with PubSubRecorder.__open(filename, "rt") as f:
+            for line in f:
+                received_at, _, frame = line.rstrip("\n").partition("\t")
+                if frame != "":
+                    yield float(received_at), frame
@@ -0,0 +1,148 @@
+import logging
+import random
+import threading
+from email.utils import parsedate_to_datetime
+from enum import Enum, auto
+
+from TwitchChannelPointsMiner.classes.Clock import Clock
+
+logger = logging.getLogger(__name__)
+
+
+class EndpointFamily(Enum):
+    GQL = auto()
+    HELIX = auto()
+    SPADE = auto()  # The spade endpoint and the pages used for discover the spade_url
+
+
+# Requests per second allowed for each family (Helix: 800 points per minute)
+DEFAULT_RATE_LIMITS = {
+    EndpointFamily.GQL: 10,
+    EndpointFamily.HELIX: 800 / 60,
+    EndpointFamily.SPADE: 5,
+}
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket. Each request consumes a token, tokens are refilled at `rate` per second
+    and the bucket can't hold more than `capacity` tokens (burst size).
+    """
+
+    def __init__(self, rate: float, capacity: int = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1, int(rate))
+        self.tokens = self.capacity
+        self.last_refill = Clock.time()
+        self.paused_until = 0
+        self.lock = threading.Lock()
+
+    def __refill(self):
+        now = Clock.time()
+        self.tokens = min(
+            self.capacity, self.tokens + (now - self.last_refill) * self.rate
+        )
+        self.last_refill = now
+
+    def acquire(self, tokens=1):
+        while True:
+            with self.lock:
+                self.__refill()
+                now = Clock.time()
+                if now < self.paused_until:
+                    wait_time = self.paused_until - now
+                elif self.tokens >= tokens:
+                    self.tokens -= tokens
+                    return
+                else:
+                    wait_time = (tokens - self.tokens) / self.rate
+            Clock.sleep(wait_time)
+
+    def set_rate(self, rate: float):
+        with self.lock:
+            self.__refill()
+            self.rate = rate
+            self.capacity = max(1, int(rate))
+            self.tokens = min(self.tokens, self.capacity)
+
+    # Stop to release tokens until the timestamp (server told us to slow down)
+    def pause_until(self, timestamp: float):
+        with self.lock:
+            self.paused_until = max(self.paused_until, timestamp)
+            self.tokens = 0
+
+
+class RateLimiter:
+    """
+    Every request to Twitch should take a token from the bucket of its endpoint family.
+    The buckets adapt to the rate-limit headers (Helix) and to the 429 / 5xx responses,
+    the retries are delayed with a jittered exponential backoff (or with the Retry-After header).
+    """
+
+    def __init__(
+        self,
+        rate_limits: dict = None,
+        max_retries: int = 4,
+        backoff_base: float = 1,
+        backoff_max: float = 60,
+    ):
+        rate_limits = {**DEFAULT_RATE_LIMITS, **(rate_limits or {})}
+        self.buckets = {
+            family: TokenBucket(rate) for family, rate in rate_limits.items()
+        }
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+
+    def acquire(self, family: EndpointFamily):
+        self.buckets[family].acquire()
+
+    def update(self, family: EndpointFamily, response):
+        bucket = self.buckets[family]
+        headers = response.headers
+
+        # Helix: Ratelimit-Limit (points per minute), Ratelimit-Remaining, Ratelimit-Reset (epoch)
+        try:
+            if "Ratelimit-Limit" in headers:
+                rate = int(headers["Ratelimit-Limit"]) / 60
+                if rate > 0 and abs(rate - bucket.rate) > 0.01:
+                    logger.debug(f"Set the {family.name} rate limit to {rate}/s")
+                    bucket.set_rate(rate)
+            if (
+                "Ratelimit-Remaining" in headers
+                and int(headers["Ratelimit-Remaining"]) == 0
+                and "Ratelimit-Reset" in headers
+            ):
+                bucket.pause_until(float(headers["Ratelimit-Reset"]))
+        except ValueError:
+            pass
+
+        if response.status_code == 429:
+            retry_after = self.retry_after(headers)
+            if retry_after is not None:
+                bucket.pause_until(Clock.time() + retry_after)
+
+    @staticmethod
+    def retry_after(headers):
+        value = headers.get("Retry-After")
+        if value is None:
+            return None
+        try:
+            return max(0, float(value))
+        except ValueError:
+            try:
+                return max(0, parsedate_to_datetime(value).timestamp() - Clock.time())
+            except (TypeError, ValueError):
+                return None
+
+    def retryable(self, response) -> bool:
+        return response.status_code == 429 or response.status_code >= 500
+
+    def backoff(self, attempt: int, response=None) -> float:
+        retry_after = (
+            self.retry_after(response.headers) if response is not None else None
+        )
+        if retry_after is not None:
+            return min(retry_after, self.backoff_max)
+        delay = min(self.backoff_max, self.backoff_base * (2**attempt))
+        return random.uniform(delay / 2, delay)
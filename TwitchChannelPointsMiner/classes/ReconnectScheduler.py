@@ -0,0 +1,54 @@
+import logging
+import random
+import threading
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+
+class ReconnectScheduler:
+    """
+    Schedule the PubSub reconnections without blocking the websocket callbacks (threading.Timer).
+    The delay grows with a jittered exponential backoff for consecutive failures and is reset
+    as soon as a connection is opened. Keep also the duration of the gaps (no topics listened).
+    """
+
+    def __init__(self, base_delay: float = 2, max_delay: float = 120):
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.attempts = 0
+        self.lock = threading.Lock()
+        self.gaps = deque(maxlen=100)
+
+    def next_delay(self) -> float:
+        with self.lock:
+            delay = min(self.max_delay, self.base_delay * (2**self.attempts))
+            self.attempts += 1
+        return random.uniform(delay / 2, delay)
+
+    def schedule(self, function, *args) -> float:
+        delay = self.next_delay()
+        timer = threading.Timer(delay, function, args)
+        timer.daemon = True
+        timer.start()
+        return delay
+
+    def reset(self):
+        with self.lock:
+            self.attempts = 0
+
+    def record_gap(self, seconds: float):
+        with self.lock:
+            self.gaps.append(seconds)
+        logger.debug(f"PubSub topics listened again after {round(seconds, 2)}s")
+
+    # Number of reconnections and duration of the gaps (seconds)
+    def stats(self) -> dict:
+        with self.lock:
+            gaps = list(self.gaps)
+        return {
+            "reconnections": len(gaps),
+            "avg_gap": round(sum(gaps) / len(gaps), 3) if gaps != [] else 0,
+            "max_gap": round(max(gaps), 3) if gaps != [] else 0,
+            "last_gap": round(gaps[-1], 3) if gaps != [] else 0,
+        }
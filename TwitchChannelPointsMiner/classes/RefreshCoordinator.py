@@ -0,0 +1,95 @@
+import logging
+import threading
+
+from TwitchChannelPointsMiner.classes.Clock import Clock
+
+logger = logging.getLogger(__name__)
+
+# After the offline event the stream is not checked again for 60 seconds
+OFFLINE_DELAY = 60
+# An offline stream with viewcount messages is checked at most every 30 seconds
+ONLINE_CHECK_INTERVAL = 30
+
+
+class RefreshCoordinator:
+    """
+    Decide when the stream info (VideoPlayerStreamInfoOverlayChannel) of a streamer must be refreshed.
+    The viewcount messages of the online streamers don't send a request: trigger() queues the streamer if its refresh
+    is due, and the queued streamers are refreshed together (batched GQL) by the next check_streamers_online.
+    The streamers in a watch slot are refreshed every `watching_interval` seconds (the spade payload needs the current
+    broadcast), the others every `interval` seconds. A viewcount of an offline streamer means that it could be online
+    again: it must be checked now (at most every 30 seconds). A trigger that doesn't cause a refresh is counted as
+    avoided.
+    """
+
+    def __init__(self, watch_scheduler, watching_interval=120, interval=300):
+        self.watch_scheduler = watch_scheduler
+        self.watching_interval = watching_interval
+        self.interval = interval
+        self.lock = threading.Lock()
+        # dict: insertion order, a streamer is queued once
+        self.pending = {}
+        self.online_checked_at = {}
+        self.triggers = 0
+        self.avoided = 0
+        self.refreshed = 0
+        self.batches = 0
+
+    def refresh_interval(self, streamer) -> int:
+        return (
+            self.watching_interval
+            if streamer in self.watch_scheduler.last_decision
+            else self.interval
+        )
+
+    def due(self, streamer) -> bool:
+        if Clock.time() < streamer.offline_at + OFFLINE_DELAY:
+            return False
+        # An offline streamer is checked for know if it's online again
+        return streamer.is_online is False or streamer.stream.update_required(
+            self.refresh_interval(streamer)
+        )
+
+    # A viewcount message, return True if the (offline) streamer must be checked now, the online ones are queued
+    def trigger(self, streamer) -> bool:
+        due = streamer.stream_up_elapsed() is True and self.due(streamer) is True
+        now = Clock.time()
+        with self.lock:
+            self.triggers += 1
+            if due is True and streamer.is_online is False:
+                if (
+                    now
+                    >= self.online_checked_at.get(streamer, 0) + ONLINE_CHECK_INTERVAL
+                ):
+                    self.online_checked_at[streamer] = now
+                    self.refreshed += 1
+                    return True
+            elif due is True and streamer not in self.pending:
+                self.pending[streamer] = None
+                return False
+            self.avoided += 1
+        return False
+
+    # The streamers to refresh now: the queued ones and the given ones with a due refresh
+    def take(self, streamers=[]) -> list:
+        with self.lock:
+            pending, self.pending = self.pending, {}
+        for streamer in streamers:
+            if streamer not in pending and self.due(streamer) is True:
+                pending[streamer] = None
+        with self.lock:
+            self.refreshed += len(pending)
+            self.batches += 1 if pending != {} else 0
+        return list(pending)
+
+    def stats(self) -> dict:
+        with self.lock:
+            return {
+                "triggers": self.triggers,
+                "avoided": self.avoided,
+                "avoided_rate": (
+                    round(self.avoided / self.triggers, 4) if self.triggers > 0 else 0
+                ),
+                "refreshed": self.refreshed,
+                "batches": self.batches,
+            }
@@ -0,0 +1,159 @@
+import itertools
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from enum import IntEnum
+
+from TwitchChannelPointsMiner.classes.Clock import Clock
+
+logger = logging.getLogger(__name__)
+
+
+class RequestPriority(IntEnum):
+    # Lower value = higher priority
+    CLAIM = 0  # Bonus claims, raids and predictions are time-sensitive
+    DROP = 1  # Drop claims and inventory lookups
+    DEFAULT = 2
+    REFRESH = 3  # Stream metadata refreshes (background)
+
+
+class RetryRequest(Exception):
+    """
+    Raised by a scheduled function that must be retried: `function(*args, **kwargs)` is queued again after `delay`
+    seconds, the worker is free meanwhile (a backoff doesn't delay the requests with a higher priority)
+    """
+
+    def __init__(self, delay, function, *args, **kwargs):
+        super().__init__(f"Retry in {round(delay, 2)}s")
+        self.delay = delay
+        self.function = function
+        self.args = args
+        self.kwargs = kwargs
+
+
+class RequestScheduler:
+    """
+    Priority queue in front of the GQL requests, executed by a small pool of workers.
+    When the rate limiter is the bottleneck the pending requests are served by priority (FIFO for the same priority),
+    so a claim-available is not stuck behind hundreds of stream refreshes.
+    A function that raises RetryRequest goes back in the queue after the delay, without keeping a worker busy.
+    With workers=0 the requests are executed by the caller (deterministic, used by the simulations).
+    """
+
+    def __init__(self, workers: int = 4):
+        self.workers = workers
+        self.queue = queue.PriorityQueue()
+        self.counter = itertools.count()
+        self.lock = threading.Lock()
+        self.waits = {
+            priority: {"count": 0, "retries": 0, "total": 0, "max": 0}
+            for priority in RequestPriority
+        }
+
+        for index in range(0, workers):
+            thread = threading.Thread(
+                target=self.__worker, name=f"RequestScheduler-{index}"
+            )
+            thread.daemon = True
+            thread.start()
+
+    def submit(self, priority: RequestPriority, function, *args, **kwargs) -> Future:
+        future = Future()
+        if self.workers == 0:
+            self.__record_wait(priority, 0)
+            self.__run(priority, future, function, args, kwargs)
+            return future
+        self.__enqueue(priority, future, function, args, kwargs)
+        return future
+
+    # retry: the request was already counted, it's back after a RetryRequest
+    def __enqueue(self, priority, future, function, args, kwargs, retry=False):
+        self.queue.put(
+            (
+                priority,
+                next(self.counter),
+                time.time(),
+                retry,
+                future,
+                function,
+                args,
+                kwargs,
+            )
+        )
+
+    # Submit and wait for the result (raise the exception of the function)
+    def execute(self, priority: RequestPriority, function, *args, **kwargs):
+        return self.submit(priority, function, *args, **kwargs).result()
+
+    def __worker(self):
+        while True:
+            (
+                priority,
+                _,
+                enqueued_at,
+                retry,
+                future,
+                function,
+                args,
+                kwargs,
+            ) = self.queue.get()
+            if retry is False:
+                self.__record_wait(priority, time.time() - enqueued_at)
+            self.__run(priority, future, function, args, kwargs)
+            self.queue.task_done()
+
+    def __run(self, priority, future, function, args, kwargs):
+        # A retried request is already running
+        if future.running() is False and future.set_running_or_notify_cancel() is False:
+            return
+        while True:
+            try:
+                future.set_result(function(*args, **kwargs))
+            except RetryRequest as retry:
+                with self.lock:
+                    self.waits[priority]["retries"] += 1
+                if self.workers == 0:
+                    Clock.sleep(retry.delay)
+                    function, args, kwargs = retry.function, retry.args, retry.kwargs
+                    continue
+                timer = threading.Timer(
+                    retry.delay,
+                    self.__enqueue,
+                    args=(priority, future, retry.function, retry.args, retry.kwargs),
+                    kwargs={"retry": True},
+                )
+                timer.daemon = True
+                timer.start()
+            except BaseException as e:
+                future.set_exception(e)
+            return
+
+    def __record_wait(self, priority, wait_time):
+        with self.lock:
+            self.waits[priority]["count"] += 1
+            self.waits[priority]["total"] += wait_time
+            self.waits[priority]["max"] = max(self.waits[priority]["max"], wait_time)
+        if wait_time > 5:
+            logger.debug(f"{priority.name} request waited {round(wait_time, 2)}s")
+
+    def pending(self) -> int:
+        return self.queue.qsize()
+
+    # For each priority: number of requests (the retries apart), average and max time spent in queue (seconds)
+    def stats(self) -> dict:
+        with self.lock:
+            return {
+                priority.name: {
+                    "count": wait["count"],
+                    "retries": wait["retries"],
+                    "avg_wait": (
+                        round(wait["total"] / wait["count"], 3)
+                        if wait["count"] > 0
+                        else 0
+                    ),
+                    "max_wait": round(wait["max"], 3),
+                }
+                for priority, wait in self.waits.items()
+            }
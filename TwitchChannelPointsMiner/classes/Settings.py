@@ -1,3 +1,17 @@
+from enum import Enum, auto
+
+
 # Empty object shared between class
 class Settings(object):
     pass
+
+
+# Who to watch with the 2 slots, the priorities are chained: the slots left by the first are filled by the second...
+class Priority(Enum):
+    ORDER = auto()  # Order of the streamers list
+    STREAK = auto()  # Watch streak missing
+    DROPS = auto()  # Drops enabled (and claim_drops = True)
+    SUBSCRIBED = auto()  # Points multiplier (subscription), the highest first
+    POINTS_ASCENDING = auto()  # Less channel points first
+    POINTS_DESCENDING = auto()  # More channel points first
+    ROUND_ROBIN = auto()  # The streamer not watched for more time first
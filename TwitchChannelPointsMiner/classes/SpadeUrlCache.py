@@ -0,0 +1,34 @@
+import logging
+import threading
+
+from TwitchChannelPointsMiner.classes.Clock import Clock
+
+logger = logging.getLogger(__name__)
+
+
+class SpadeUrlCache:
+    """
+    The spade_url is the same for every channel, keep it once for the whole process (class attributes).
+    The value expires after `ttl` seconds or when someone report that the cached url doesn't work anymore (invalidate).
+    """
+
+    spade_url = None
+    expire_at = 0
+    lock = threading.Lock()
+
+    @classmethod
+    def get(cls, fetch, ttl):
+        with cls.lock:
+            if cls.spade_url is None or Clock.time() >= cls.expire_at:
+                cls.spade_url = fetch()
+                cls.expire_at = Clock.time() + ttl
+                logger.debug(f"Spade url refreshed: {cls.spade_url}")
+            return cls.spade_url
+
+    # stale_url: the url that failed, ignored if another streamer has already refreshed it
+    @classmethod
+    def invalidate(cls, stale_url=None):
+        with cls.lock:
+            if stale_url is None or stale_url == cls.spade_url:
+                cls.spade_url = None
+                cls.expire_at = 0
@@ -0,0 +1,39 @@
+import threading
+
+
+class StreamersIndex:
+    """
+    Lookup tables channel_id -> Streamer and username -> Streamer.
+    Owned by the miner and updated together with the streamers list, used for dispatch the PubSub messages in O(1).
+    """
+
+    def __init__(self, streamers: list = []):
+        self.lock = threading.Lock()
+        self.by_channel_id = {}
+        self.by_username = {}
+        for streamer in streamers:
+            self.add(streamer)
+
+    def add(self, streamer):
+        with self.lock:
+            self.by_channel_id[str(streamer.channel_id)] = streamer
+            self.by_username[streamer.username] = streamer
+
+    def remove(self, streamer):
+        with self.lock:
+            if self.by_channel_id.get(str(streamer.channel_id)) is streamer:
+                del self.by_channel_id[str(streamer.channel_id)]
+            if self.by_username.get(streamer.username) is streamer:
+                del self.by_username[streamer.username]
+
+    def get_by_channel_id(self, channel_id):
+        return self.by_channel_id.get(str(channel_id))
+
+    def get_by_username(self, username):
+        return self.by_username.get(username.lower().strip())
+
+    def __len__(self):
+        return len(self.by_channel_id)
+
+    def __contains__(self, streamer):
+        return self.by_channel_id.get(str(streamer.channel_id)) is streamer
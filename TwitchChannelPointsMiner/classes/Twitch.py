@@ -7,33 +7,83 @@
 import copy
 import logging
 import os
-import random
 import re
-import time
 from pathlib import Path
+from urllib.parse import quote
 
 import requests
 
+from TwitchChannelPointsMiner.classes.Clock import Clock
+from TwitchChannelPointsMiner.classes.DropsClaimer import DropsClaimer
+from TwitchChannelPointsMiner.classes.DropsTracker import DropsTracker
 from TwitchChannelPointsMiner.classes.Exceptions import (
     StreamerDoesNotExistException,
     StreamerIsOfflineException,
     TimeBasedDropNotFound,
 )
+from TwitchChannelPointsMiner.classes.HttpClient import HttpClient
+from TwitchChannelPointsMiner.classes.InventoryCache import InventoryCache
+from TwitchChannelPointsMiner.classes.RateLimiter import EndpointFamily, RateLimiter
+from TwitchChannelPointsMiner.classes.RefreshCoordinator import RefreshCoordinator
+from TwitchChannelPointsMiner.classes.RequestScheduler import (
+    RequestPriority,
+    RequestScheduler,
+    RetryRequest,
+)
 from TwitchChannelPointsMiner.classes.Settings import Settings
+from TwitchChannelPointsMiner.classes.SpadeUrlCache import SpadeUrlCache
 from TwitchChannelPointsMiner.classes.TwitchLogin import TwitchLogin
-from TwitchChannelPointsMiner.constants.twitch import API, CLIENT_ID, GQLOperations
+from TwitchChannelPointsMiner.classes.WatchScheduler import WatchScheduler
+from TwitchChannelPointsMiner.constants.twitch import (
+    API,
+    CLIENT_ID,
+    SPADE,
+    STATIC,
+    GQLOperations,
+)
 
 logger = logging.getLogger(__name__)
 
 
 class Twitch:
-    def __init__(self, username, user_agent):
+    def __init__(
+        self,
+        username,
+        user_agent,
+        rate_limits: dict = None,
+        gql_max_batch_size=30,
+        spade_url_ttl=3600,
+        gql_workers=4,
+        inventory_ttl=300,
+        drops_claimer_workers=1,
+    ):
         cookies_path = os.path.join(Path().absolute(), "cookies")
         Path(cookies_path).mkdir(parents=True, exist_ok=True)
         self.cookies_file = os.path.join(cookies_path, f"{username}.pkl")
         self.user_agent = user_agent
         self.twitch_login = TwitchLogin(CLIENT_ID, username, self.user_agent)
+        self.http = HttpClient(self.user_agent)
         self.running = True
+        # Global budget (per endpoint family) shared by all the threads that talk with Twitch
+        self.rate_limiter = RateLimiter(rate_limits)
+        # The GQL requests are served by priority (claims first, stream refreshes last)
+        self.scheduler = RequestScheduler(workers=gql_workers)
+        self.gql_max_batch_size = gql_max_batch_size
+        self.spade_url_ttl = spade_url_ttl
+        # Drops in progress, used for give the watch slots to the streams that advance a drop
+        self.drops_tracker = DropsTracker(missing_ttl=inventory_ttl)
+        # Inventory indexed by drop id, fetched again only when expired or older than a completed drop
+        self.inventory = InventoryCache(self.__get_inventory, ttl=inventory_ttl)
+        # Drops claimed in background, the claimed ones are saved next to the cookies
+        self.drops_claimer = DropsClaimer(
+            self.claim_drop,
+            filename=os.path.join(cookies_path, f"{username}-drops.json"),
+            workers=drops_claimer_workers,
+        )
+        # Who to watch, updated by the online / offline / watch streak events
+        self.watch_scheduler = WatchScheduler(drops_tracker=self.drops_tracker)
+        # When refresh the stream info, the viewcount messages are coalesced in the batched refreshes
+        self.refresh_coordinator = RefreshCoordinator(self.watch_scheduler)
 
     def login(self):
         if os.path.isfile(self.cookies_file) is False:
@@ -43,9 +93,18 @@ class Twitch:
             self.twitch_login.load_cookies(self.cookies_file)
             self.twitch_login.set_token(self.twitch_login.get_auth_token())
 
-    def update_stream(self, streamer):
-        if streamer.stream.update_required() is True:
-            stream_info = self.get_stream_info(streamer)
+    # If the response of VideoPlayerStreamInfoOverlayChannel was already fetched (batch) we can pass it
+    def update_stream(self, streamer, stream_info_response=None):
+        # A response was requested because the refresh was due (RefreshCoordinator)
+        if (
+            stream_info_response is not None
+            or streamer.stream.update_required() is True
+        ):
+            stream_info = (
+                self.get_stream_info(streamer)
+                if stream_info_response is None
+                else self.__parse_stream_info(stream_info_response)
+            )
             streamer.stream.update(
                 broadcast_id=stream_info["stream"]["id"],
                 title=stream_info["broadcastSettings"]["title"],
@@ -53,6 +112,8 @@ class Twitch:
                 tags=stream_info["stream"]["tags"],
                 viewers_count=stream_info["stream"]["viewersCount"],
             )
+            # The drops may be enabled / disabled (Priority.DROPS)
+            self.watch_scheduler.update(streamer)
 
             event_properties = {
                 "channel_id": streamer.channel_id,
@@ -71,26 +132,84 @@ class Twitch:
                 {"event": "minute-watched", "properties": event_properties}
             ]
 
+    # The spade_url is shared by all the channels, download the pages only if the cached value is expired.
     def get_spade_url(self, streamer):
-        headers = {"User-Agent": self.user_agent}
-        main_page_request = requests.get(streamer.streamer_url, headers=headers)
+        streamer.stream.spade_url = SpadeUrlCache.get(
+            lambda: self.__fetch_spade_url(streamer.streamer_url),
+            self.spade_url_ttl,
+        )
+
+    def __fetch_spade_url(self, streamer_url):
+        if SPADE is not None:
+            self.http.mount(SPADE)
+            return SPADE
+
+        main_page_request = self.__request(EndpointFamily.SPADE, "GET", streamer_url)
         response = main_page_request.text
         settings_url = re.search(
-            "(https://static.twitchcdn.net/config/settings.*?js)", response
+            f"({re.escape(STATIC)}/config/settings.*?js)", response
         ).group(1)
 
-        settings_request = requests.get(settings_url, headers=headers)
+        settings_request = self.__request(EndpointFamily.SPADE, "GET", settings_url)
         response = settings_request.text
-        streamer.stream.spade_url = re.search('"spade_url":"(.*?)"', response).group(1)
-
-    def post_gql_request(self, json_data):
-        response = requests.post(
+        spade_url = re.search('"spade_url":"(.*?)"', response).group(1)
+        self.http.mount(spade_url)
+        return spade_url
+
+    # Every request to Twitch pass from here. Wait for a token of the endpoint family,
+    # retry with a jittered exponential backoff on 429 / 5xx and on connection errors
+    # scheduled: executed by a RequestScheduler worker, the backoff is spent out of the worker (RetryRequest)
+    def __request(self, family, method, url, attempt=0, scheduled=False, **kwargs):
+        while True:
+            self.rate_limiter.acquire(family)
+            try:
+                response = self.http.request(method, url, **kwargs)
+            except (
+                requests.exceptions.ConnectionError,
+                requests.exceptions.Timeout,
+            ):
+                # Timeout: the HttpClient gives a timeout to every request
+                if attempt >= self.rate_limiter.max_retries:
+                    raise
+                response = None
+            else:
+                self.rate_limiter.update(family, response)
+                if (
+                    self.rate_limiter.retryable(response) is False
+                    or attempt >= self.rate_limiter.max_retries
+                ):
+                    return response
+
+            delay = self.rate_limiter.backoff(attempt, response)
+            logger.debug(
+                f"{family.name} request to {url} failed ({'connection error or timeout' if response is None else response.status_code}), retry in {round(delay, 2)}s"
+            )
+            if scheduled is True:
+                raise RetryRequest(
+                    delay,
+                    self.__request,
+                    family,
+                    method,
+                    url,
+                    attempt=attempt + 1,
+                    scheduled=True,
+                    **kwargs,
+                )
+            Clock.sleep(delay)
+            attempt += 1
+
+    def post_gql_request(self, json_data, priority=RequestPriority.DEFAULT):
+        response = self.scheduler.execute(
+            priority,
+            self.__request,
+            EndpointFamily.GQL,
+            "POST",
             GQLOperations.url,
+            scheduled=True,
             json=json_data,
             headers={
                 "Authorization": f"OAuth {self.twitch_login.get_auth_token()}",
                 "Client-Id": CLIENT_ID,
-                "User-Agent": self.user_agent,
             },
         )
         logger.debug(
@@ -98,6 +217,23 @@ class Twitch:
         )
         return response.json()
 
+    # The GQL endpoint accept a list of operations and reply with a list of responses (same order)
+    def post_gql_batch(
+        self, operations, max_batch_size=None, priority=RequestPriority.DEFAULT
+    ):
+        max_batch_size = (
+            max_batch_size if max_batch_size is not None else self.gql_max_batch_size
+        )
+        responses = []
+        for index in range(0, len(operations), max_batch_size):
+            chunk = operations[index : index + max_batch_size]
+            response = self.post_gql_request(chunk, priority=priority)
+            if isinstance(response, list) is False or len(response) != len(chunk):
+                # The whole batch was rejected, every operation get the same (error) response
+                response = [response] * len(chunk)
+            responses += response
+        return responses
+
     def get_broadcast_id(self, streamer):
         json_data = copy.deepcopy(GQLOperations.WithIsStreamLiveQuery)
         json_data["variables"] = {"id": streamer.channel_id}
@@ -108,32 +244,66 @@ class Twitch:
         else:
             raise StreamerIsOfflineException
 
-    def get_stream_info(self, streamer):
+    def __stream_info_operation(self, streamer):
         json_data = copy.deepcopy(GQLOperations.VideoPlayerStreamInfoOverlayChannel)
         json_data["variables"] = {"channel": streamer.username}
-        response = self.post_gql_request(json_data)
+        return json_data
+
+    def __parse_stream_info(self, response):
         if response["data"]["user"]["stream"] is None:
             raise StreamerIsOfflineException
         else:
             return response["data"]["user"]
 
-    def check_streamer_online(self, streamer):
-        if time.time() < streamer.offline_at + 60:
+    def get_stream_info(self, streamer):
+        response = self.post_gql_request(
+            self.__stream_info_operation(streamer), priority=RequestPriority.REFRESH
+        )
+        return self.__parse_stream_info(response)
+
+    def check_streamer_online(self, streamer, stream_info_response=None):
+        if Clock.time() < streamer.offline_at + 60:
             return
 
         if streamer.is_online is False:
             try:
                 self.get_spade_url(streamer)
-                self.update_stream(streamer)
+                self.update_stream(streamer, stream_info_response)
             except StreamerIsOfflineException:
                 streamer.set_offline()
             else:
                 streamer.set_online()
+                self.watch_scheduler.update(streamer)
         else:
             try:
-                self.update_stream(streamer)
+                self.update_stream(streamer, stream_info_response)
             except StreamerIsOfflineException:
                 streamer.set_offline()
+                self.watch_scheduler.update(streamer)
+
+    # Refresh the stream info of many streamers with a single (batched) GQL request:
+    # the given ones with a due refresh and the ones queued by the viewcount messages
+    def check_streamers_online(self, streamers):
+        streamers = self.refresh_coordinator.take(streamers)
+        if streamers == []:
+            return
+        try:
+            responses = self.post_gql_batch(
+                [self.__stream_info_operation(streamer) for streamer in streamers],
+                priority=RequestPriority.REFRESH,
+            )
+        except requests.exceptions.RequestException as e:
+            logger.error(f"Error while trying to refresh the streams info: {e}")
+            return
+
+        for streamer, response in zip(streamers, responses):
+            try:
+                self.check_streamer_online(streamer, response)
+            except Exception:
+                logger.error(
+                    f"Exception raised while checking if {streamer} is online",
+                    exc_info=True,
+                )
 
     def claim_bonus(self, streamer, claim_id):
         if Settings.logger.less is False:
@@ -145,8 +315,9 @@ class Twitch:
         json_data["variables"] = {
             "input": {"channelID": streamer.channel_id, "claimID": claim_id}
         }
-        self.post_gql_request(json_data)
+        self.post_gql_request(json_data, priority=RequestPriority.CLAIM)
 
+    # Called by the DropsClaimer, return True if claimed
     def claim_drop(self, drop_instance_id, streamer=None):
         if streamer is not None:
             logger.info(
@@ -159,39 +330,54 @@ class Twitch:
 
         json_data = copy.deepcopy(GQLOperations.DropsPage_ClaimDropRewards)
         json_data["variables"] = {"input": {"dropInstanceID": drop_instance_id}}
-        self.post_gql_request(json_data)
-
-    def search_drop_in_inventory(self, streamer, drop_id):
-        inventory = self.__get_inventory()
-        for campaign in inventory["dropCampaignsInProgress"]:
-            for drop in campaign["timeBasedDrops"]:
-                if drop["id"] == drop_id:
-                    return drop["self"]
-        raise TimeBasedDropNotFound
-
+        response = self.post_gql_request(json_data, priority=RequestPriority.DROP)
+        claimed = (response.get("data") or {}).get("claimDropRewards") is not None
+        if claimed is True:
+            self.inventory.invalidate()
+        return claimed
+
+    # not_before: the inventory must be requested after this time (e.g. when the drop-progress was received)
+    def search_drop_in_inventory(self, streamer, drop_id, not_before=None):
+        drop = self.inventory.drop(drop_id, not_before=not_before)
+        if drop is None:
+            raise TimeBasedDropNotFound
+        return drop
+
+    # The claims are queued, the startup doesn't wait them
     def claim_all_drops_from_inventory(self):
-        inventory = self.__get_inventory()
-        for campaign in inventory["dropCampaignsInProgress"]:
-            for drop in campaign["timeBasedDrops"]:
-                if drop["self"]["dropInstanceID"] is not None:
-                    self.claim_drop(drop["self"]["dropInstanceID"])
-                    time.sleep(random.uniform(10, 30))
+        for drop_instance_id in self.inventory.claimable():
+            self.drops_claimer.submit(drop_instance_id)
+
+    # Read the drops campaigns in progress, the watch slots go to the streams closest to complete a drop
+    def load_drops_campaigns(self, not_before=None):
+        self.drops_tracker.load(self.inventory.get(not_before=not_before))
+        self.watch_scheduler.refresh()
 
     def __get_inventory(self):
-        response = self.post_gql_request(GQLOperations.Inventory)
+        response = self.post_gql_request(
+            GQLOperations.Inventory, priority=RequestPriority.DROP
+        )
         return response["data"]["currentUser"]["inventory"]
 
     # Load the amount of current points for a channel, check if a bonus is available
     def load_channel_points_context(self, streamer):
+        response = self.post_gql_request(
+            self.__channel_points_context_operation(streamer)
+        )
+        self.__parse_channel_points_context(streamer, response)
+
+    def __channel_points_context_operation(self, streamer):
         json_data = copy.deepcopy(GQLOperations.ChannelPointsContext)
         json_data["variables"] = {"channelLogin": streamer.username}
+        return json_data
 
-        response = self.post_gql_request(json_data)
+    def __parse_channel_points_context(self, streamer, response):
         if response["data"]["community"] is None:
             raise StreamerDoesNotExistException
         channel = response["data"]["community"]["channel"]
         community_points = channel["self"]["communityPoints"]
         streamer.channel_points = community_points["balance"]
+        streamer.active_multipliers = community_points.get("activeMultipliers")
 
         if community_points["availableClaim"] is not None:
             self.claim_bonus(streamer, community_points["availableClaim"]["id"])
@@ -207,95 +393,90 @@ class Twitch:
                 "transactionID": "412118d3********79ac856",  # How we can calculate this?
             }
         }
-        return self.post_gql_request(json_data)
-
-    def send_minute_watched_events(self, streamers, watch_streak=False, chunk_size=3):
-        while self.running:
-            streamers_index = [
-                i
-                for i in range(0, len(streamers))
-                if streamers[i].is_online
-                and (
-                    streamers[i].online_at == 0
-                    or (time.time() - streamers[i].online_at) > 30
-                )
-            ]
-
-            """
-            Check if we need need to change priority based on watch streak
-            Viewers receive points for returning for x consecutive streams.
-            Each stream must be at least 10 minutes long and it must have been at least 30 minutes since the last stream ended.
-
-            Watch at least 6m for get the +10
-            """
-            streamers_watching = []
-            if watch_streak is True:
-                for index in streamers_index:
-                    if (
-                        streamers[index].settings.watch_streak is True
-                        and streamers[index].stream.watch_streak_missing is True
-                        and (
-                            streamers[index].offline_at == 0
-                            or ((time.time() - streamers[index].offline_at) // 60) > 30
-                        )
-                        and streamers[index].stream.minute_watched < 7
-                    ):
-                        logger.debug(
-                            f"Switch priority: {streamers[index]}, WatchStreak missing is {streamers[index].stream.watch_streak_missing} and minute_watched: {round(streamers[index].stream.minute_watched, 2)}"
-                        )
-                        streamers_watching.append(index)
-                        if len(streamers_watching) == 2:
-                            break
+        return self.post_gql_request(json_data, priority=RequestPriority.CLAIM)
 
-            if streamers_watching == []:
-                streamers_watching = streamers_index
-            else:
-                while len(streamers_watching) < 2 and len(streamers_index) > 1:
-                    another_streamer_index = streamers_index.pop(0)
-                    if another_streamer_index not in streamers_watching:
-                        streamers_watching.append(another_streamer_index)
+    def send_minute_watched_events(self, streamers, priority, chunk_size=3):
+        self.watch_scheduler.set_priority(priority)
+        for streamer in streamers:
+            self.watch_scheduler.add(streamer)
 
-            """
-            Twitch has a limit - you can't watch more than 2 channels at one time.
-            We take the first two streamers from the list as they have the highest priority (based on order or WatchStreak).
-            """
-            streamers_watching = streamers_watching[:2]
+        while self.running:
+            # Max 2 streamers, chosen by the chain of priorities
+            streamers_watching = self.watch_scheduler.next()
 
-            for index in streamers_watching:
-                next_iteration = time.time() + 60 / len(streamers_watching)
+            for streamer in streamers_watching:
+                next_iteration = Clock.time() + 60 / len(streamers_watching)
 
                 try:
-                    response = requests.post(
-                        streamers[index].stream.spade_url,
-                        data=streamers[index].stream.encode_payload(),
-                        headers={"User-Agent": self.user_agent},
+                    response = self.__request(
+                        EndpointFamily.SPADE,
+                        "POST",
+                        streamer.stream.spade_url,
+                        data=streamer.stream.encode_payload(),
                     )
                     logger.debug(
-                        f"Send minute watched request for {streamers[index]} - Status code: {response.status_code}"
+                        f"Send minute watched request for {streamer} - Status code: {response.status_code}"
                     )
                     if response.status_code == 204:
-                        streamers[index].stream.update_minute_watched()
-                except requests.exceptions.ConnectionError as e:
+                        streamer.stream.update_minute_watched()
+                        self.watch_scheduler.watched(streamer)
+                    else:
+                        self.__refresh_spade_url(streamer)
+                except requests.exceptions.RequestException as e:
                     logger.error(f"Error while trying to watch a minute: {e}")
+                    self.__refresh_spade_url(streamer)
 
                 # Create chunk of sleep of speed-up the break loop after CTRL+C
-                sleep_time = max(next_iteration - time.time(), 0) / chunk_size
+                sleep_time = max(next_iteration - Clock.time(), 0) / chunk_size
                 for i in range(0, chunk_size):
-                    time.sleep(sleep_time)
+                    Clock.sleep(sleep_time)
                     if self.running is False:
                         break
 
             if streamers_watching == []:
-                time.sleep(60)
+                Clock.sleep(60)
+
+    # The minute-watched request failed with the cached spade url: discover it again
+    def __refresh_spade_url(self, streamer):
+        SpadeUrlCache.invalidate(stale_url=streamer.stream.spade_url)
+        try:
+            self.get_spade_url(streamer)
+        except (requests.exceptions.RequestException, AttributeError) as e:
+            logger.error(f"Unable to refresh the spade url for {streamer}: {e}")
 
     def get_channel_id(self, streamer_username):
-        json_response = self.__do_helix_request(f"/users?login={streamer_username}")
+        json_response = self.__do_helix_request(
+            f"/users?login={quote(streamer_username)}"
+        )
         data = json_response["data"]
         if len(data) >= 1:
             return data[0]["id"]
         else:
             raise StreamerDoesNotExistException
 
+    # Resolve a list of usernames with one Helix request for each chunk of 100 logins (max allowed)
+    # Return a dict username -> channel_id, the missing usernames are not present in the dict
+    def get_channel_ids(self, streamers_username, chunk_size=100):
+        channel_ids = {}
+        for index in range(0, len(streamers_username), chunk_size):
+            chunk = streamers_username[index : index + chunk_size]
+            query = "/users?" + "&".join(
+                [f"login={quote(username)}" for username in chunk]
+            )
+            response = self.__do_helix_request(query, response_as_json=False)
+            if response.status_code == 200:
+                for user in response.json().get("data", []):
+                    channel_ids[user["login"].lower()] = user["id"]
+                continue
+
+            logger.error(
+                f"Unable to resolve {len(chunk)} usernames - Status code: {response.status_code}, Content: {response.text}"
+            )
+            # A single invalid username rejects the whole chunk: resolve the usernames one by one
+            if len(chunk) > 1:
+                channel_ids.update(self.get_channel_ids(chunk, chunk_size=1))
+        return channel_ids
+
     def get_followers(self, first=100):
         followers = []
         pagination = {}
@@ -307,7 +488,6 @@ class Twitch:
             json_response = self.__do_helix_request(query)
             pagination = json_response["pagination"]
             followers += [fw["to_name"].lower() for fw in json_response["data"]]
-            time.sleep(random.uniform(0.3, 0.7))
 
             if pagination == {}:
                 break
@@ -316,7 +496,15 @@ class Twitch:
 
     def __do_helix_request(self, query, response_as_json=True):
         url = f"{API}/helix/{query.strip('/')}"
-        response = self.twitch_login.session.get(url)
+        response = self.__request(
+            EndpointFamily.HELIX,
+            "GET",
+            url,
+            headers={
+                "Authorization": f"Bearer {self.twitch_login.get_auth_token()}",
+                "Client-Id": CLIENT_ID,
+            },
+        )
         logger.debug(
             f"Query: {query}, Status code: {response.status_code}, Content: {response.json()}"
         )
@@ -327,7 +515,7 @@ class Twitch:
             streamer.raid = raid
             json_data = copy.deepcopy(GQLOperations.JoinRaid)
             json_data["variables"] = {"input": {"raidID": raid.raid_id}}
-            self.post_gql_request(json_data)
+            self.post_gql_request(json_data, priority=RequestPriority.CLAIM)
 
             logger.info(
                 f"Joining raid from {streamer} to {raid.target_login}!",
@@ -335,10 +523,45 @@ class Twitch:
             )
 
     def viewer_is_mod(self, streamer):
+        response = self.post_gql_request(self.__mod_view_operation(streamer))
+        self.__parse_mod_view(streamer, response)
+
+    def __mod_view_operation(self, streamer):
         json_data = copy.deepcopy(GQLOperations.ModViewChannelQuery)
         json_data["variables"] = {"channelLogin": streamer.username}
-        response = self.post_gql_request(json_data)
+        return json_data
+
+    def __parse_mod_view(self, streamer, response):
         try:
             streamer.viewer_is_mod = response["data"]["user"]["self"]["isModerator"]
-        except (ValueError, KeyError):
+        except (ValueError, KeyError, TypeError):
             streamer.viewer_is_mod = False
+
+    # Populate the streamers with default values. For each streamer we have 3 operations:
+    # 1. Load channel points and auto-claim bonus
+    # 2. Check if streamers is online
+    # 3. Check if the user is a Streamer. In thi case you can't do prediction
+    # All the operations are sent with post_gql_batch, the errors are isolated per streamer
+    def load_streamers_data(self, streamers):
+        operations = []
+        for streamer in streamers:
+            operations += [
+                self.__channel_points_context_operation(streamer),
+                self.__stream_info_operation(streamer),
+                self.__mod_view_operation(streamer),
+            ]
+
+        responses = self.post_gql_batch(operations)
+        for index, streamer in enumerate(streamers):
+            context, stream_info, mod_view = responses[index * 3 : (index + 1) * 3]
+            try:
+                self.__parse_channel_points_context(streamer, context)
+                self.check_streamer_online(streamer, stream_info)
+                self.__parse_mod_view(streamer, mod_view)
+                if streamer.viewer_is_mod is True:
+                    streamer.settings.make_predictions = False
+            except Exception:
+                logger.error(
+                    f"Exception raised while loading data for {streamer}",
+                    exc_info=True,
+                )
@@ -11,6 +11,7 @@ import browser_cookie3
 import requests
 
 from TwitchChannelPointsMiner.classes.Exceptions import WrongCookiesException
+from TwitchChannelPointsMiner.constants.twitch import API, PASSPORT
 
 logger = logging.getLogger(__name__)
 
@@ -117,7 +118,7 @@ class TwitchLogin:
         self.session.headers.update({"Authorization": f"Bearer {self.token}"})
 
     def send_login_request(self, json_data):
-        r = self.session.post("https://passport.twitch.tv/login", json=json_data)
+        r = self.session.post(f"{PASSPORT}/login", json=json_data)
         j = r.json()
         return j
 
@@ -149,7 +150,7 @@ class TwitchLogin:
         if self.token is None:
             return False
 
-        r = self.session.get(f"https://api.twitch.tv/helix/users?login={self.username}")
+        r = self.session.get(f"{API}/helix/users?login={self.username}")
         response = r.json()
         if "data" in response:
             self.login_check_result = True
@@ -1,26 +1,68 @@
 import json
 import logging
 import time
+from collections import deque
 
 from websocket import WebSocketApp
 
+from TwitchChannelPointsMiner.classes.Clock import Clock
 from TwitchChannelPointsMiner.utils import create_nonce
 
 logger = logging.getLogger(__name__)
 
 
 class TwitchWebSocket(WebSocketApp):
-    def listen(self, topic, auth_token=None):
-        data = {"topics": [str(topic)]}
-        if topic.is_user_topic() and auth_token is not None:
+    # Send a single LISTEN frame for many topics, the nonce is used for match the RESPONSE
+    def listen(self, topics, auth_token=None):
+        topics = topics if isinstance(topics, list) else [topics]
+        data = {"topics": [str(topic) for topic in topics]}
+        if (
+            any(topic.is_user_topic() for topic in topics) is True
+            and auth_token is not None
+        ):
             data["auth_token"] = auth_token
 
         nonce = create_nonce()
+        self.pending_listens[nonce] = {"topics": topics, "sent_at": time.time()}
         self.send({"type": "LISTEN", "nonce": nonce, "data": data})
 
+    def handle_listen_response(self, response):
+        request = self.pending_listens.pop(response.get("nonce"), None)
+        if request is None:
+            return
+
+        self.listen_latencies.append(time.time() - request["sent_at"])
+        if len(response.get("error", "")) > 0:
+            self.failed_listens += 1
+            if len(request["topics"]) > 1:
+                # We don't know which topic is wrong, retry them one by one
+                logger.warning(
+                    f"#{self.index} - Error while trying to listen for {len(request['topics'])} topics: {response['error']}, retry one by one"
+                )
+                auth_token = self.twitch.twitch_login.get_auth_token()
+                for topic in request["topics"]:
+                    self.listen(topic, auth_token)
+            else:
+                logger.error(
+                    f"#{self.index} - Error while trying to listen for {request['topics'][0]}: {response['error']}"
+                )
+
+    # Acknowledgement latency (seconds) of the last LISTEN frames
+    def listen_stats(self):
+        latencies = list(self.listen_latencies)
+        return {
+            "acked": len(latencies),
+            "pending": len(self.pending_listens),
+            "failed": self.failed_listens,
+            "avg_latency": (
+                round(sum(latencies) / len(latencies), 3) if latencies != [] else 0
+            ),
+            "max_latency": round(max(latencies), 3) if latencies != [] else 0,
+        }
+
     def ping(self):
         self.send({"type": "PING"})
-        self.last_ping = time.time()
+        self.last_ping = Clock.time()
 
     def send(self, request):
         request_str = json.dumps(request, separators=(",", ":"))
@@ -37,20 +79,27 @@ class TwitchWebSocket(WebSocketApp):
         # Custom attribute
         self.topics = []
         self.pending_topics = []
+        self.pending_listens = {}
+        self.listen_latencies = deque(maxlen=100)
+        self.failed_listens = 0
+        self.index = None
+
+        # Reconnection: the connections replaced by this one and the replacements of this one
+        self.replaces = []
+        self.pending_replacements = set()
+        self.disconnected_at = None
 
         self.twitch = parent_pool.twitch
         self.browser = parent_pool.browser
         self.streamers = parent_pool.streamers
+        self.streamers_index = parent_pool.streamers_index
         self.events_predictions = parent_pool.events_predictions
 
-        self.last_message_timestamp = None
-        self.last_message_type_channel = None
-
-        self.last_pong = time.time()
-        self.last_ping = time.time()
+        self.last_pong = Clock.time()
+        self.last_ping = Clock.time()
 
     def elapsed_last_pong(self):
-        return (time.time() - self.last_pong) // 60
+        return (Clock.time() - self.last_pong) // 60
 
     def elapsed_last_ping(self):
-        return (time.time() - self.last_ping) // 60
+        return (Clock.time() - self.last_ping) // 60
@@ -0,0 +1,71 @@
+import heapq
+import itertools
+import threading
+
+
+class VirtualClock:
+    """
+    Deterministic virtual time for the simulations (install it with Clock.use).
+    The participants (the thread that installed the clock and the threads started with spawn) run one at a time:
+    sleep() gives the turn to the participant with the earliest wake-up time (FIFO on ties) and moves the time forward.
+    A participant must not wait on anything else than the clock while another one holds a lock it needs.
+    """
+
+    def __init__(self, start: float = 0):
+        self.now = start
+        self.condition = threading.Condition()
+        self.wakeups = []
+        self.counter = itertools.count()
+        self.turn = None
+        self.stopped = False
+
+    def time(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float):
+        with self.condition:
+            if self.stopped is True:
+                return
+            turn = next(self.counter)
+            heapq.heappush(self.wakeups, (self.now + max(0, seconds), turn))
+            self.__next_turn()
+            self.__wait_turn(turn)
+
+    # Start a new participant, it runs as soon as the current one sleeps
+    def spawn(self, target, *args, name=None) -> threading.Thread:
+        with self.condition:
+            turn = next(self.counter)
+            heapq.heappush(self.wakeups, (self.now, turn))
+
+        def run():
+            with self.condition:
+                self.__wait_turn(turn)
+            try:
+                target(*args)
+            finally:
+                with self.condition:
+                    if self.stopped is False:
+                        self.__next_turn()
+
+        thread = threading.Thread(target=run, name=name)
+        thread.daemon = True
+        thread.start()
+        return thread
+
+    # Wake up every participant, from now on sleep() returns immediately
+    def stop(self):
+        with self.condition:
+            self.stopped = True
+            self.condition.notify_all()
+
+    def __next_turn(self):
+        if self.wakeups == []:
+            self.turn = None
+            return
+        wake_at, self.turn = heapq.heappop(self.wakeups)
+        self.now = max(self.now, wake_at)
+        self.condition.notify_all()
+
+    def __wait_turn(self, turn):
+        while self.turn != turn and self.stopped is False:
+            self.condition.wait()
@@ -0,0 +1,205 @@
+import heapq
+import itertools
+import logging
+import threading
+
+from TwitchChannelPointsMiner.classes.Clock import Clock
+from TwitchChannelPointsMiner.classes.Settings import Priority
+
+logger = logging.getLogger(__name__)
+
+# A stream is watched only after 30 seconds from the online event
+ONLINE_DELAY = 30
+# Watch streak: it must have been at least 30 minutes since the last stream ended
+STREAK_OFFLINE_DELAY = 31 * 60
+# Watch at least 6 minutes for get the watch streak
+STREAK_MINUTES = 7
+
+
+class WatchScheduler:
+    """
+    Choose the streamers to watch (Twitch allows 2 at one time) without scanning all the streamers every minute.
+    Each Priority has a heap of the eligible online streamers, ordered by its score (then by position in the list).
+    The slots are filled by the first priority, the remaining ones by the next priorities of the chain.
+    The conditions that become true with the time (online since 30 seconds, offline since 30 minutes) are in a
+    heap ordered by time. update(streamer) must be called when the streamer goes online / offline, gets points,
+    the stream info is refreshed, a minute or a drop progress is watched: the old entries are not removed,
+    they are skipped when popped.
+    """
+
+    def __init__(
+        self,
+        priority: list = [Priority.STREAK, Priority.ORDER],
+        slots: int = 2,
+        drops_tracker=None,
+    ):
+        self.slots = slots
+        self.drops_tracker = drops_tracker
+        self.lock = threading.Lock()
+        self.counter = itertools.count()
+        self.ranks = {}
+        self.versions = {}
+        self.last_watched = {}
+        self.pending = []
+        self.last_decision = []
+        self.set_priority(priority)
+
+    def set_priority(self, priority):
+        priority = priority if isinstance(priority, list) else [priority]
+        with self.lock:
+            self.priority = priority
+            self.heaps = {item: [] for item in priority}
+            self.pending = []
+            self.__update_all()
+
+    # Score again every streamer (e.g. the drops campaigns changed)
+    def refresh(self):
+        with self.lock:
+            self.__update_all()
+
+    def __update_all(self):
+        now = Clock.time()
+        for streamer in self.ranks:
+            self.__update(streamer, now)
+
+    def add(self, streamer):
+        with self.lock:
+            if streamer not in self.ranks:
+                self.ranks[streamer] = next(self.counter)
+                self.__update(streamer, Clock.time())
+
+    def remove(self, streamer):
+        with self.lock:
+            self.ranks.pop(streamer, None)
+            self.versions.pop(streamer, None)
+            self.last_watched.pop(streamer, None)
+
+    def update(self, streamer):
+        with self.lock:
+            if streamer in self.ranks:
+                self.__update(streamer, Clock.time())
+
+    # A minute was watched (ROUND_ROBIN)
+    def watched(self, streamer):
+        with self.lock:
+            if streamer in self.ranks:
+                now = Clock.time()
+                self.last_watched[streamer] = now
+                self.__update(streamer, now)
+
+    def __len__(self):
+        return len(self.ranks)
+
+    # Sort key of the streamer for the priority, None if not eligible
+    def __score(self, priority, streamer, rank):
+        if priority == Priority.STREAK:
+            return (
+                (rank,)
+                if streamer.settings.watch_streak is True
+                and streamer.stream.watch_streak_missing is True
+                and streamer.stream.minute_watched < STREAK_MINUTES
+                else None
+            )
+        if priority == Priority.DROPS:
+            if (
+                streamer.settings.claim_drops is False
+                or streamer.stream.drops_enabled is False
+            ):
+                return None
+            # Campaigns unknown: every stream with the drops enabled
+            if self.drops_tracker is None or self.drops_tracker.loaded is False:
+                return (0, rank)
+            # The drop closest to completion first, nothing if the game doesn't advance a drop
+            remaining = self.drops_tracker.remaining(streamer)
+            return (remaining, rank) if remaining is not None else None
+        if priority == Priority.SUBSCRIBED:
+            multiplier = streamer.total_points_multiplier()
+            return (-multiplier, rank) if multiplier > 0 else None
+        if priority == Priority.POINTS_ASCENDING:
+            return (streamer.channel_points, rank)
+        if priority == Priority.POINTS_DESCENDING:
+            return (-streamer.channel_points, rank)
+        if priority == Priority.ROUND_ROBIN:
+            return (self.last_watched.get(streamer, 0), rank)
+        return (rank,)
+
+    # A new version for the streamer, the entries with an older version are not valid anymore
+    def __update(self, streamer, now):
+        version = next(self.counter)
+        self.versions[streamer] = version
+        if streamer.is_online is False:
+            return
+
+        ready_at = streamer.online_at + ONLINE_DELAY if streamer.online_at != 0 else 0
+        if ready_at > now:
+            heapq.heappush(self.pending, (ready_at, version, streamer))
+            return
+
+        rank = self.ranks[streamer]
+        for priority, heap in self.heaps.items():
+            score = self.__score(priority, streamer, rank)
+            if score is None:
+                continue
+            if priority == Priority.STREAK and streamer.offline_at != 0:
+                eligible_at = streamer.offline_at + STREAK_OFFLINE_DELAY
+                if eligible_at > now:
+                    heapq.heappush(self.pending, (eligible_at, version, streamer))
+                    continue
+            heapq.heappush(heap, (score, version, streamer))
+        self.__compact()
+
+    def __valid(self, entry):
+        return self.versions.get(entry[2]) == entry[1]
+
+    # The first `count` valid entries of the heap, the invalid ones on the way are dropped
+    def __top(self, heap, count, exclude=[]):
+        popped, top = [], []
+        while heap != [] and len(top) < count:
+            entry = heapq.heappop(heap)
+            if self.__valid(entry) is True:
+                popped.append(entry)
+                if entry[2] not in exclude:
+                    top.append(entry[2])
+        for entry in popped:
+            heapq.heappush(heap, entry)
+        return top
+
+    # Rebuild the heaps when the invalid entries are the majority
+    def __compact(self):
+        for heap in list(self.heaps.values()) + [self.pending]:
+            if len(heap) > 2 * len(self.versions) + 64:
+                heap[:] = [entry for entry in heap if self.__valid(entry) is True]
+                heapq.heapify(heap)
+
+    def next(self) -> list:
+        with self.lock:
+            now = Clock.time()
+            while self.pending != [] and self.pending[0][0] <= now:
+                entry = heapq.heappop(self.pending)
+                if self.__valid(entry) is True:
+                    self.__update(entry[2], now)
+
+            watching, reasons = [], {}
+            for priority, heap in self.heaps.items():
+                if len(watching) == self.slots:
+                    break
+                for streamer in self.__top(
+                    heap, self.slots - len(watching), exclude=watching
+                ):
+                    watching.append(streamer)
+                    reasons[streamer] = priority
+
+            if watching != self.last_decision:
+                self.last_decision = watching
+                logger.debug(
+                    "Watch: "
+                    + (
+                        ", ".join(
+                            f"{streamer.username} ({reasons[streamer].name}, minute_watched: {round(streamer.stream.minute_watched, 2)})"
+                            for streamer in watching
+                        )
+                        if watching != []
+                        else "nobody"
+                    )
+                )
+            return watching
@@ -1,34 +1,61 @@
-import json
 import logging
 import random
 import threading
-import time
 
 from dateutil import parser
 
+from TwitchChannelPointsMiner.classes.Clock import Clock
+from TwitchChannelPointsMiner.classes.DedupCache import DedupCache
 from TwitchChannelPointsMiner.classes.entities.EventPrediction import EventPrediction
-from TwitchChannelPointsMiner.classes.entities.Message import Message
 from TwitchChannelPointsMiner.classes.entities.Raid import Raid
 from TwitchChannelPointsMiner.classes.Exceptions import TimeBasedDropNotFound
+from TwitchChannelPointsMiner.classes.MessageDispatcher import MessageDispatcher
+from TwitchChannelPointsMiner.classes.PubSubDecoder import PubSubDecoder
+from TwitchChannelPointsMiner.classes.ReconnectScheduler import ReconnectScheduler
 from TwitchChannelPointsMiner.classes.TwitchWebSocket import TwitchWebSocket
 from TwitchChannelPointsMiner.constants.twitch import WEBSOCKET
 from TwitchChannelPointsMiner.utils import (
     _millify,
     bet_condition,
     calculate_start_after,
-    get_streamer_index,
 )
 
 logger = logging.getLogger(__name__)
 
 
 class WebSocketsPool:
-    def __init__(self, twitch, browser, streamers, events_predictions):
-        self.ws = None
+    def __init__(
+        self,
+        twitch,
+        browser,
+        streamers,
+        streamers_index,
+        events_predictions,
+        max_topics_per_connection=50,
+        max_connections=10,
+        listen_batch_size=50,
+        recorder=None,
+        dispatcher_workers=2,
+    ):
+        self.ws = []
         self.twitch = twitch
         self.browser = browser
         self.streamers = streamers
+        self.streamers_index = streamers_index
         self.events_predictions = events_predictions
+        self.max_topics_per_connection = max_topics_per_connection
+        self.max_connections = max_connections
+        self.listen_batch_size = listen_batch_size
+        self.recorder = recorder
+        self.dispatcher = MessageDispatcher(
+            self.process_message, workers=dispatcher_workers
+        )
+        self.dedup = DedupCache()
+        self.decoder = PubSubDecoder(skip=self.skip_message)
+        self.lock = threading.RLock()
+        self.connections_counter = 0
+        self.reconnect_scheduler = ReconnectScheduler()
+        self.running = True
 
     """
     API Limits
@@ -38,278 +65,425 @@ class WebSocketsPool:
     """
 
     def submit(self, topic):
-        if self.ws is None or len(self.ws.topics) >= 50:
-            self.create_new_websocket()
-
-        self.ws.topics.append(topic)
-
-        if not self.ws.is_opened:
-            self.ws.pending_topics.append(topic)
-        else:
-            self.ws.listen(topic, self.twitch.twitch_login.get_auth_token())
+        self.submit_topics([topic])
+
+    # Each topic goes to the connection with less topics, a new connection is created only if all the others are full.
+    # The topics for an opened connection are sent with a single LISTEN frame, the others are sent on open
+    def submit_topics(self, topics):
+        with self.lock:
+            to_listen = {}
+            connections = set()
+            for topic in topics:
+                available = [
+                    ws
+                    for ws in self.ws
+                    if len(ws.topics) < self.max_topics_per_connection
+                ]
+                if available == []:
+                    ws = self.create_new_websocket()
+                else:
+                    ws = min(available, key=lambda ws: len(ws.topics))
+
+                ws.topics.append(topic)
+                connections.add(ws)
+
+                if not ws.is_opened:
+                    ws.pending_topics.append(topic)
+                else:
+                    to_listen.setdefault(ws, []).append(topic)
+
+            for ws, ws_topics in to_listen.items():
+                self.listen_in_batches(ws, ws_topics)
+            return connections
+
+    def listen_in_batches(self, ws, topics):
+        auth_token = self.twitch.twitch_login.get_auth_token()
+        for index in range(0, len(topics), self.listen_batch_size):
+            ws.listen(topics[index : index + self.listen_batch_size], auth_token)
+
+    def listen_stats(self):
+        return {ws.index: ws.listen_stats() for ws in list(self.ws)}
 
     def create_new_websocket(self):
-        self.ws = TwitchWebSocket(
-            WEBSOCKET,
-            on_message=WebSocketsPool.on_message,
-            on_open=WebSocketsPool.on_open,
-            on_close=WebSocketsPool.handle_websocket_reconnection,
-        )
-        self.ws.reset(self)
+        with self.lock:
+            if len(self.ws) >= self.max_connections:
+                logger.warning(
+                    f"More than {self.max_connections} PubSub connections are required for {self.topics_count() + 1} topics"
+                )
+
+            ws = TwitchWebSocket(
+                WEBSOCKET,
+                on_message=WebSocketsPool.on_message,
+                on_open=WebSocketsPool.on_open,
+                on_close=WebSocketsPool.handle_websocket_reconnection,
+            )
+            ws.reset(self)
+            ws.index = self.connections_counter
+            self.connections_counter += 1
+            self.ws.append(ws)
+
+        thread_ws = threading.Thread(target=lambda: ws.run_forever())
+        thread_ws.daemon = True
+        thread_ws.start()
+        return ws
+
+    def topics_count(self):
+        return sum(len(ws.topics) for ws in self.ws)
 
-        self.thread_ws = threading.Thread(target=lambda: self.ws.run_forever())
-        self.thread_ws.daemon = True
-        self.thread_ws.start()
+    # Check the health of every connection (the ping thread could be dead)
+    def check_connections(self, max_elapsed_last_ping=5):
+        for ws in list(self.ws):
+            if ws.elapsed_last_ping() > max_elapsed_last_ping:
+                logger.info(
+                    f"#{ws.index} - The last ping was sent more than {max_elapsed_last_ping} minutes ago. Reconnecting to the WebSocket..."
+                )
+                self.reconnect(ws)
 
     def end(self):
-        self.ws.keep_running = False
-        self.ws.close()
+        with self.lock:
+            self.running = False
+            connections = list(self.ws)
+        for ws in connections:
+            ws.keep_running = False
+            ws.close()
+        if self.recorder is not None:
+            self.recorder.close()
 
     @staticmethod
     def on_open(ws):
         def run():
-            ws.is_opened = True
-            ws.ping()
-            for topic in ws.pending_topics:
-                ws.listen(topic, ws.twitch.twitch_login.get_auth_token())
+            with ws.parent_pool.lock:
+                ws.is_opened = True
+                ws.ping()
+                ws.parent_pool.listen_in_batches(ws, ws.pending_topics)
+                ws.pending_topics = []
+                ws.parent_pool.on_replacement_opened(ws)
 
             while not ws.is_closed:
                 ws.ping()
-                time.sleep(random.uniform(25, 30))
+                Clock.sleep(random.uniform(25, 30))
 
                 if ws.elapsed_last_pong() > 15 and ws.is_reconneting is False:
                     logger.info(
-                        "The last pong was received more than 15 minutes ago. Reconnect the WebSocket"
+                        f"#{ws.index} - The last pong was received more than 15 minutes ago. Reconnect the WebSocket"
                     )
-                    ws.keep_running = True
-                    ws.is_reconneting = True
-                    WebSocketsPool.handle_websocket_reconnection(ws)
+                    ws.parent_pool.reconnect(ws)
 
         thread_ws = threading.Thread(target=run)
         thread_ws.daemon = True
         thread_ws.start()
 
+    # on_close callback, the websocket-client version >= 1.0 pass also the close status code and message
     @staticmethod
-    def handle_websocket_reconnection(ws):
+    def handle_websocket_reconnection(ws, *args):
         ws.is_closed = True
-        if ws.keep_running is True:
-            logger.info("Reconnecting to Twitch PubSub server in 60 seconds")
-            time.sleep(60)
+        ws.parent_pool.reconnect(ws)
+
+    # The connection is removed from the pool and its topics are spread on the other (or new) connections.
+    # If make_before_break the old connection is closed only when the topics are listened again (RECONNECT message),
+    # else the connection is closed immediately and the topics are submitted after a backoff delay
+    def reconnect(self, ws, make_before_break=False):
+        with self.lock:
+            # Already handled (on_close is called also when we close a dead connection)
+            if self.running is False or ws not in self.ws:
+                return
+            self.ws.remove(ws)
 
-            self = ws.parent_pool
-            if self.ws == ws:
-                self.ws = None
-            for topic in ws.topics:
-                self.submit(topic)
+            ws.is_reconneting = True
+            ws.disconnected_at = None if make_before_break is True else Clock.time()
+            # This connection was the replacement of other connections that are still waiting: close them
+            for old_ws in ws.replaces:
+                if old_ws.disconnected_at is None:
+                    old_ws.disconnected_at = Clock.time()
+                ws.disconnected_at = min(
+                    ws.disconnected_at or Clock.time(), old_ws.disconnected_at
+                )
+                old_ws.close()
+            ws.replaces = []
+
+        # Skip the topics of the streamers removed in the meantime
+        topics = [
+            topic
+            for topic in ws.topics
+            if topic.is_user_topic() or topic.streamer in self.streamers_index
+        ]
+
+        if make_before_break is True:
+            logger.info(f"#{ws.index} - Reconnection required, open a new connection")
+            self.resubscribe(ws, topics)
+        else:
+            ws.close()
+            delay = self.reconnect_scheduler.schedule(self.resubscribe, ws, topics)
+            logger.info(
+                f"#{ws.index} - Reconnecting to Twitch PubSub server in {round(delay, 2)} seconds"
+            )
+
+    def resubscribe(self, old_ws, topics):
+        with self.lock:
+            if self.running is False:
+                return
+            connections = self.submit_topics(topics)
+            old_ws.pending_replacements = set(
+                ws for ws in connections if ws.is_opened is False
+            )
+            for ws in old_ws.pending_replacements:
+                ws.replaces.append(old_ws)
+            if old_ws.pending_replacements == set():
+                self.__replaced(old_ws)
+
+    def on_replacement_opened(self, ws):
+        with self.lock:
+            self.reconnect_scheduler.reset()
+            for old_ws in ws.replaces:
+                old_ws.pending_replacements.discard(ws)
+                if old_ws.pending_replacements == set():
+                    self.__replaced(old_ws)
+            ws.replaces = []
+
+    # All the topics of the old connection are listened again
+    def __replaced(self, old_ws):
+        self.reconnect_scheduler.record_gap(
+            0
+            if old_ws.disconnected_at is None
+            else Clock.time() - old_ws.disconnected_at
+        )
+        if old_ws.is_closed is False:
+            old_ws.close()
+
+    # A viewcount message of an online streamer only queues a stream refresh (RefreshCoordinator), done in batch by
+    # Twitch.check_streamers_online: it's never decoded. The ones of the offline streamers are handled (checked now)
+    def skip_message(self, topic, topic_user, message_type) -> bool:
+        if topic != "video-playback-by-id" or message_type != "viewcount":
+            return False
+        streamer = self.streamers_index.get_by_channel_id(topic_user)
+        if streamer is None:
+            return True
+        if streamer.is_online is False:
+            return False
+        self.twitch.refresh_coordinator.trigger(streamer)
+        return True
 
     @staticmethod
     def on_message(ws, message):
+        if ws.parent_pool.recorder is not None:
+            ws.parent_pool.recorder.record(message)
         logger.debug(f"Received: {message.strip()}")
-        response = json.loads(message)
-
-        if response["type"] == "MESSAGE":
-            # We should create a Message class ...
-            message = Message(response["data"])
-
-            # If we have more than one PubSub connection, messages may be duplicated
-            # Check the concatenation between message_type.top.channel_id
-            if (
-                ws.last_message_type_channel is not None
-                and ws.last_message_timestamp is not None
-                and ws.last_message_timestamp == message.timestamp
-                and ws.last_message_type_channel == message.identifier
-            ):
+        frame_type, response = ws.parent_pool.decoder.decode(message)
+
+        if frame_type == "MESSAGE":
+            # Not handled (or nothing to do), dropped by the decoder
+            if response is None:
                 return
+            message = response
 
-            ws.last_message_timestamp = message.timestamp
-            ws.last_message_type_channel = message.identifier
-
-            streamer_index = get_streamer_index(ws.streamers, message.channel_id)
-            if streamer_index != -1:
-                try:
-                    if message.topic == "community-points-user-v1":
-                        if message.type == "points-earned":
-                            earned = message.data["point_gain"]["total_points"]
-                            reason_code = message.data["point_gain"]["reason_code"]
-                            balance = message.data["balance"]["balance"]
-                            ws.streamers[streamer_index].channel_points = balance
-                            logger.info(
-                                f"+{earned} → {ws.streamers[streamer_index]} - Reason: {reason_code}.",
-                                extra={"emoji": ":rocket:"},
-                            )
-                            ws.streamers[streamer_index].update_history(
-                                reason_code, earned
-                            )
-                        elif message.type == "claim-available":
-                            ws.twitch.claim_bonus(
-                                ws.streamers[streamer_index],
-                                message.data["claim"]["id"],
-                            )
+            # If we have more than one PubSub connection (or a make-before-break reconnection), messages may be duplicated
+            # Check the concatenation between message_type.top.channel_id and the timestamp across all the connections
+            if ws.parent_pool.dedup.seen((message.identifier, message.timestamp)):
+                return
 
-                    elif message.topic == "video-playback-by-id":
-                        # There is stream-up message type, but it's sent earlier than the API updates
-                        if message.type == "stream-up":
-                            ws.streamers[streamer_index].stream_up = time.time()
-                        elif message.type == "stream-down":
-                            if ws.streamers[streamer_index].is_online is True:
-                                ws.streamers[streamer_index].set_offline()
-                        elif message.type == "viewcount":
-                            if ws.streamers[streamer_index].stream_up_elapsed():
-                                ws.twitch.check_streamer_online(
-                                    ws.streamers[streamer_index]
-                                )
+            streamer = ws.streamers_index.get_by_channel_id(message.channel_id)
+            if streamer is not None:
+                # Don't block the receive thread, the message is processed by the dispatcher workers
+                ws.parent_pool.dispatcher.dispatch(streamer, message)
 
-                    elif message.topic == "raid":
-                        if message.type == "raid_update_v2":
-                            raid = Raid(
-                                message.message["raid"]["id"],
-                                message.message["raid"]["target_login"],
-                            )
-                            ws.twitch.update_raid(ws.streamers[streamer_index], raid)
+        elif frame_type == "RESPONSE":
+            ws.handle_listen_response(response)
 
-                    elif message.topic == "predictions-channel-v1":
+        elif frame_type == "RECONNECT":
+            ws.parent_pool.reconnect(ws, make_before_break=True)
 
-                        event_dict = message.data["event"]
-                        event_id = event_dict["id"]
-                        event_status = event_dict["status"]
+        elif frame_type == "PONG":
+            ws.last_pong = Clock.time()
 
-                        current_tmsp = parser.parse(message.timestamp)
+    def process_message(self, streamer, message):
+        try:
+            if message.topic == "community-points-user-v1":
+                if message.type == "points-earned":
+                    earned = message.data["point_gain"]["total_points"]
+                    reason_code = message.data["point_gain"]["reason_code"]
+                    balance = message.data["balance"]["balance"]
+                    streamer.channel_points = balance
+                    logger.info(
+                        f"+{earned} → {streamer} - Reason: {reason_code}.",
+                        extra={"emoji": ":rocket:"},
+                    )
+                    streamer.update_history(reason_code, earned)
+                    # New balance (Priority.POINTS_*) or watch streak gained
+                    self.twitch.watch_scheduler.update(streamer)
+                elif message.type == "claim-available":
+                    self.twitch.claim_bonus(
+                        streamer,
+                        message.data["claim"]["id"],
+                    )
 
+            elif message.topic == "video-playback-by-id":
+                # There is stream-up message type, but it's sent earlier than the API updates
+                if message.type == "stream-up":
+                    streamer.stream_up = Clock.time()
+                elif message.type == "stream-down":
+                    if streamer.is_online is True:
+                        streamer.set_offline()
+                        self.twitch.watch_scheduler.update(streamer)
+                elif message.type == "viewcount":
+                    # Offline streamer: maybe online again, check it now
+                    if self.twitch.refresh_coordinator.trigger(streamer) is True:
+                        self.twitch.check_streamer_online(streamer)
+
+            elif message.topic == "raid":
+                if message.type == "raid_update_v2":
+                    raid = Raid(
+                        message.message["raid"]["id"],
+                        message.message["raid"]["target_login"],
+                    )
+                    self.twitch.update_raid(streamer, raid)
+
+            elif message.topic == "predictions-channel-v1":
+
+                event_dict = message.data["event"]
+                event_id = event_dict["id"]
+                event_status = event_dict["status"]
+
+                current_tmsp = parser.parse(message.timestamp)
+
+                if (
+                    message.type == "event-created"
+                    and event_id not in self.events_predictions
+                ):
+                    if event_status == "ACTIVE":
+                        prediction_window_seconds = float(
+                            event_dict["prediction_window_seconds"]
+                        )
+                        prediction_window_seconds -= (
+                            25 if prediction_window_seconds <= 180 else 60
+                        )
+                        event = EventPrediction(
+                            streamer,
+                            event_id,
+                            event_dict["title"],
+                            parser.parse(event_dict["created_at"]),
+                            prediction_window_seconds,
+                            event_status,
+                            event_dict["outcomes"],
+                        )
                         if (
-                            message.type == "event-created"
-                            and event_id not in ws.events_predictions
+                            streamer.is_online
+                            and event.closing_bet_after(current_tmsp) > 0
+                            and bet_condition(
+                                self.browser,
+                                event,
+                                logger,
+                            )
+                            is True
                         ):
-                            if event_status == "ACTIVE":
-                                prediction_window_seconds = float(
-                                    event_dict["prediction_window_seconds"]
-                                )
-                                prediction_window_seconds -= (
-                                    25 if prediction_window_seconds <= 180 else 60
-                                )
-                                event = EventPrediction(
-                                    ws.streamers[streamer_index],
-                                    event_id,
-                                    event_dict["title"],
-                                    parser.parse(event_dict["created_at"]),
-                                    prediction_window_seconds,
-                                    event_status,
-                                    event_dict["outcomes"],
+                            self.events_predictions[event_id] = event
+                            (
+                                start_bet_status,
+                                execution_time,
+                            ) = self.browser.start_bet(
+                                self.events_predictions[event_id]
+                            )
+                            if start_bet_status is True:
+                                # place_bet_thread = threading.Timer(event.closing_bet_after(current_tmsp), self.twitch.make_predictions, (self.events_predictions[event_id],))
+                                start_after = calculate_start_after(
+                                    event.closing_bet_after(current_tmsp),
+                                    execution_time,
                                 )
-                                if (
-                                    ws.streamers[streamer_index].is_online
-                                    and event.closing_bet_after(current_tmsp) > 0
-                                    and bet_condition(
-                                        ws.browser,
-                                        event,
-                                        logger,
-                                    )
-                                    is True
-                                ):
-                                    ws.events_predictions[event_id] = event
-                                    (
-                                        start_bet_status,
-                                        execution_time,
-                                    ) = ws.browser.start_bet(
-                                        ws.events_predictions[event_id]
-                                    )
-                                    if start_bet_status is True:
-                                        # place_bet_thread = threading.Timer(event.closing_bet_after(current_tmsp), ws.twitch.make_predictions, (ws.events_predictions[event_id],))
-                                        start_after = calculate_start_after(
-                                            event.closing_bet_after(current_tmsp),
-                                            execution_time,
-                                        )
-
-                                        place_bet_thread = threading.Timer(
-                                            start_after,
-                                            ws.browser.place_bet,
-                                            (ws.events_predictions[event_id],),
-                                        )
-                                        place_bet_thread.daemon = True
-                                        place_bet_thread.start()
-
-                                        logger.info(
-                                            f"Place the bet after: {start_after}s for: {ws.events_predictions[event_id]}",
-                                            extra={"emoji": ":alarm_clock:"},
-                                        )
-                                    else:
-                                        del ws.events_predictions[event_id]
-
-                        elif (
-                            message.type == "event-updated"
-                            and event_id in ws.events_predictions
-                        ):
-                            ws.events_predictions[event_id].status = event_status
-                            # Game over we can't update anymore the values... The bet was placed!
-                            if (
-                                ws.events_predictions[event_id].bet_placed is False
-                                and ws.events_predictions[event_id].bet.decision == {}
-                            ):
-                                ws.events_predictions[event_id].bet.update_outcomes(
-                                    event_dict["outcomes"]
+
+                                place_bet_thread = threading.Timer(
+                                    start_after,
+                                    self.browser.place_bet,
+                                    (self.events_predictions[event_id],),
                                 )
+                                place_bet_thread.daemon = True
+                                place_bet_thread.start()
 
-                    elif message.topic == "predictions-user-v1":
-                        event_id = message.data["prediction"]["event_id"]
-                        if event_id in ws.events_predictions:
-                            if message.type == "prediction-result":
-                                event_result = message.data["prediction"]["result"]
                                 logger.info(
-                                    f"{ws.events_predictions[event_id]} - Result: {event_result['type']}, Points won: {_millify(event_result['points_won']) if event_result['points_won'] else 0}",
-                                    extra={"emoji": ":bar_chart:"},
-                                )
-                                points_won = (
-                                    event_result["points_won"]
-                                    if event_result["points_won"]
-                                    else 0
+                                    f"Place the bet after: {start_after}s for: {self.events_predictions[event_id]}",
+                                    extra={"emoji": ":alarm_clock:"},
                                 )
-                                ws.events_predictions[event_id].final_result = {
-                                    "type": event_result["type"],
-                                    "won": points_won,
-                                }
-                            elif message.type == "prediction-made":
-                                ws.events_predictions[event_id].bet_confirmed = True
-
-                    elif message.topic == "user-drop-events":
-                        if message.type == "drop-progress":
-                            current = message.data["current_progress_min"]
-                            required = message.data["required_progress_min"]
-                            if current >= required:
-                                try:
-                                    drop = ws.twitch.search_drop_in_inventory(
-                                        ws.streamers[streamer_index],
-                                        message.data["drop_id"],
-                                    )
-                                    if drop["dropInstanceID"] is not None:
-                                        ws.twitch.claim_drop(
-                                            drop["dropInstanceID"],
-                                            ws.streamers[streamer_index],
-                                        )
-                                except TimeBasedDropNotFound:
-                                    logger.error(
-                                        f"Unable to find {message.data['drop_id']} in your inventory"
-                                    )
                             else:
-                                # Skip 0% and 100% ...
-                                percentage_state = int((current / required) * 100)
-                                if percentage_state != 0 and percentage_state % 25 == 0:
-                                    logger.info(
-                                        f"Drop event {percentage_state}% for {ws.streamers[streamer_index]}!",
-                                        extra={"emoji": ":package:"},
-                                    )
-
-                except Exception:
-                    logger.error(
-                        f"Exception raised for topic: {message.topic} and message: {message}",
-                        exc_info=True,
+                                del self.events_predictions[event_id]
+
+                elif (
+                    message.type == "event-updated"
+                    and event_id in self.events_predictions
+                ):
+                    self.events_predictions[event_id].status = event_status
+                    # Game over we can't update anymore the values... The bet was placed!
+                    if (
+                        self.events_predictions[event_id].bet_placed is False
+                        and self.events_predictions[event_id].bet.decision == {}
+                    ):
+                        self.events_predictions[event_id].bet.update_outcomes(
+                            event_dict["outcomes"]
+                        )
+
+            elif message.topic == "predictions-user-v1":
+                event_id = message.data["prediction"]["event_id"]
+                if event_id in self.events_predictions:
+                    if message.type == "prediction-result":
+                        event_result = message.data["prediction"]["result"]
+                        logger.info(
+                            f"{self.events_predictions[event_id]} - Result: {event_result['type']}, Points won: {_millify(event_result['points_won']) if event_result['points_won'] else 0}",
+                            extra={"emoji": ":bar_chart:"},
+                        )
+                        points_won = (
+                            event_result["points_won"]
+                            if event_result["points_won"]
+                            else 0
+                        )
+                        self.events_predictions[event_id].final_result = {
+                            "type": event_result["type"],
+                            "won": points_won,
+                        }
+                    elif message.type == "prediction-made":
+                        self.events_predictions[event_id].bet_confirmed = True
+
+            elif message.topic == "user-drop-events":
+                if message.type == "drop-progress":
+                    current = message.data["current_progress_min"]
+                    required = message.data["required_progress_min"]
+                    drop_id = message.data["drop_id"]
+                    received_at = Clock.time()
+                    known = self.twitch.drops_tracker.progress(
+                        drop_id, current, required
                     )
+                    if known is False:
+                        # New campaign, read again the inventory (not for each message if the drop isn't there)
+                        if self.twitch.drops_tracker.recently_missing(drop_id) is False:
+                            self.twitch.load_drops_campaigns(not_before=received_at)
+                            if drop_id not in self.twitch.drops_tracker:
+                                self.twitch.drops_tracker.not_found(drop_id)
+                    elif current >= required:
+                        # This drop doesn't need more minutes
+                        self.twitch.watch_scheduler.refresh()
+                    else:
+                        self.twitch.watch_scheduler.update(streamer)
+
+                    if current >= required:
+                        try:
+                            drop = self.twitch.search_drop_in_inventory(
+                                streamer,
+                                drop_id,
+                                not_before=received_at,
+                            )
+                            if drop["dropInstanceID"] is not None:
+                                self.twitch.drops_claimer.submit(
+                                    drop["dropInstanceID"], streamer
+                                )
+                        except TimeBasedDropNotFound:
+                            logger.error(f"Unable to find {drop_id} in your inventory")
+                    else:
+                        # Skip 0% and 100% ...
+                        percentage_state = int((current / required) * 100)
+                        if percentage_state != 0 and percentage_state % 25 == 0:
+                            logger.info(
+                                f"Drop event {percentage_state}% for {streamer}!",
+                                extra={"emoji": ":package:"},
+                            )
 
-        elif response["type"] == "RESPONSE" and len(response.get("error", "")) > 0:
-            raise RuntimeError(f"Error while trying to listen for a topic: {response}")
-
-        elif response["type"] == "RECONNECT":
-            logger.info(f"Reconnection required and keep running is: {ws.keep_running}")
-            ws.is_reconneting = True
-            WebSocketsPool.handle_websocket_reconnection(ws)
-
-        elif response["type"] == "PONG":
-            ws.last_pong = time.time()
+        except Exception:
+            logger.error(
+                f"Exception raised for topic: {message.topic} and message: {message}",
+                exc_info=True,
+            )
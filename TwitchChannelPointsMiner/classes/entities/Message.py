@@ -1,21 +1,17 @@
-import json
-
-from TwitchChannelPointsMiner.utils import server_time
+from TwitchChannelPointsMiner.utils import json_loads, server_time
 
 
 class Message:
+    # The nested message (a JSON string) is decoded only when accessed,
+    # timestamp, channel_id and identifier are computed once on demand
     def __init__(self, data):
         self.topic, self.topic_user = data["topic"].split(".")
 
-        self.message = json.loads(data["message"])
-        self.type = self.message["type"]
-
-        self.data = self.message["data"] if "data" in self.message else None
-
-        self.timestamp = self.__get_timestamp()
-        self.channel_id = self.__get_channel_id()
-
-        self.identifier = f"{self.type}.{self.topic}.{self.channel_id}"
+        self.__raw_message = data["message"]
+        self.__message = None
+        self.__timestamp = None
+        self.__channel_id = None
+        self.__identifier = None
 
     def __repr__(self):
         return f"{self.message}"
@@ -23,31 +19,59 @@ class Message:
     def __str__(self):
         return f"{self.message}"
 
+    @property
+    def message(self):
+        if self.__message is None:
+            self.__message = json_loads(self.__raw_message)
+        return self.__message
+
+    @property
+    def type(self):
+        return self.message["type"]
+
+    @property
+    def data(self):
+        return self.message["data"] if "data" in self.message else None
+
+    @property
+    def timestamp(self):
+        if self.__timestamp is None:
+            self.__timestamp = self.__get_timestamp()
+        return self.__timestamp
+
+    @property
+    def channel_id(self):
+        if self.__channel_id is None:
+            self.__channel_id = self.__get_channel_id()
+        return self.__channel_id
+
+    @property
+    def identifier(self):
+        if self.__identifier is None:
+            self.__identifier = f"{self.type}.{self.topic}.{self.channel_id}"
+        return self.__identifier
+
     def __get_timestamp(self):
+        data = self.data
         return (
             server_time(self.message)
-            if self.data is None
-            else (
-                self.data["timestamp"]
-                if "timestamp" in self.data
-                else server_time(self.data)
-            )
+            if data is None
+            else (data["timestamp"] if "timestamp" in data else server_time(data))
         )
 
     def __get_channel_id(self):
+        data = self.data
         return (
             self.topic_user
-            if self.data is None
+            if data is None
             else (
-                self.data["prediction"]["channel_id"]
-                if "prediction" in self.data
+                data["prediction"]["channel_id"]
+                if "prediction" in data
                 else (
-                    self.data["claim"]["channel_id"]
-                    if "claim" in self.data
+                    data["claim"]["channel_id"]
+                    if "claim" in data
                     else (
-                        self.data["channel_id"]
-                        if "channel_id" in self.data
-                        else self.topic_user
+                        data["channel_id"] if "channel_id" in data else self.topic_user
                     )
                 )
             )
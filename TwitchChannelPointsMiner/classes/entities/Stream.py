@@ -1,8 +1,8 @@
 import json
 import logging
-import time
 from base64 import b64encode
 
+from TwitchChannelPointsMiner.classes.Clock import Clock
 from TwitchChannelPointsMiner.classes.Settings import Settings
 from TwitchChannelPointsMiner.constants.twitch import DROP_ID
 
@@ -25,9 +25,23 @@ class Stream:
 
         self.init_watch_streak()
 
+    # The payload is replaced (never mutated) by Twitch.update_stream, so the encoded form can be reused every minute
+    @property
+    def payload(self):
+        return self.__payload
+
+    @payload.setter
+    def payload(self, payload):
+        self.__payload = payload
+        self.__encoded_payload = None
+
     def encode_payload(self) -> dict:
-        json_event = json.dumps(self.payload, separators=(",", ":"))
-        return {"data": (b64encode(json_event.encode("utf-8"))).decode("utf-8")}
+        if self.__encoded_payload is None:
+            json_event = json.dumps(self.payload, separators=(",", ":"))
+            self.__encoded_payload = {
+                "data": (b64encode(json_event.encode("utf-8"))).decode("utf-8")
+            }
+        return self.__encoded_payload
 
     def update(self, broadcast_id, title, game, tags, viewers_count):
         self.broadcast_id = broadcast_id
@@ -39,7 +53,7 @@ class Stream:
         self.drops_enabled = (
             DROP_ID in [tag["id"] for tag in self.tags] and self.game != {}
         )
-        self.__last_update = time.time()
+        self.__last_update = Clock.time()
 
         logger.debug(f"Update: {self}")
 
@@ -62,8 +76,10 @@ class Stream:
     def game_name(self):
         return None if self.game in [{}, None] else self.game["name"]
 
-    def update_required(self):
-        return self.__last_update == 0 or (time.time() - self.__last_update) >= 120
+    def update_required(self, interval=120):
+        return (
+            self.__last_update == 0 or (Clock.time() - self.__last_update) >= interval
+        )
 
     def init_watch_streak(self):
         self.watch_streak_missing = True
@@ -73,6 +89,6 @@ class Stream:
     def update_minute_watched(self):
         if self.__minute_watched_timestamp != 0:
             self.minute_watched += round(
-                (time.time() - self.__minute_watched_timestamp) / 60, 5
+                (Clock.time() - self.__minute_watched_timestamp) / 60, 5
             )
-        self.__minute_watched_timestamp = time.time()
+        self.__minute_watched_timestamp = Clock.time()
@@ -1,6 +1,6 @@
 import logging
-import time
 
+from TwitchChannelPointsMiner.classes.Clock import Clock
 from TwitchChannelPointsMiner.classes.entities.Bet import BetSettings
 from TwitchChannelPointsMiner.classes.entities.Stream import Stream
 from TwitchChannelPointsMiner.classes.Settings import Settings
@@ -46,6 +46,7 @@ class Streamer(object):
         self.online_at = 0
         self.offline_at = 0
         self.channel_points = 0
+        self.active_multipliers = None
         self.minute_watched_requests = None
         self.viewer_is_mod = False
 
@@ -69,14 +70,14 @@ class Streamer(object):
 
     def set_offline(self):
         if self.is_online is True:
-            self.offline_at = time.time()
+            self.offline_at = Clock.time()
             self.is_online = False
 
         logger.info(f"{self} is Offline!", extra={"emoji": ":sleeping:"})
 
     def set_online(self):
         if self.is_online is False:
-            self.online_at = time.time()
+            self.online_at = Clock.time()
             self.is_online = True
             self.stream.init_watch_streak()
 
@@ -99,5 +100,13 @@ class Streamer(object):
         if reason_code == "WATCH_STREAK":
             self.stream.watch_streak_missing = False
 
+    # Sum of the active multipliers (subscription), 0 if none
+    def total_points_multiplier(self):
+        return (
+            sum(multiplier["factor"] for multiplier in self.active_multipliers)
+            if self.active_multipliers is not None
+            else 0
+        )
+
     def stream_up_elapsed(self):
-        return self.stream_up == 0 or ((time.time() - self.stream_up) > 120)
+        return self.stream_up == 0 or ((Clock.time() - self.stream_up) > 120)
@@ -1,13 +1,22 @@
-# Twitch endpoints
-URL = "https://www.twitch.tv"
-API = "https://api.twitch.tv"
-WEBSOCKET = "wss://pubsub-edge.twitch.tv/v1"
+import os
+
+# Twitch endpoints, every value can be overridden with an environment variable
+# (for example to point the miner to the fake backend: python -m benchmarks.fake_twitch)
+URL = os.environ.get("TWITCH_URL", "https://www.twitch.tv")
+API = os.environ.get("TWITCH_API", "https://api.twitch.tv")
+GQL = os.environ.get("TWITCH_GQL", "https://gql.twitch.tv/gql")
+WEBSOCKET = os.environ.get("TWITCH_WEBSOCKET", "wss://pubsub-edge.twitch.tv/v1")
+PASSPORT = os.environ.get("TWITCH_PASSPORT", "https://passport.twitch.tv")
+# Host of the settings.js (linked by the channel page) that contains the spade_url
+STATIC = os.environ.get("TWITCH_STATIC", "https://static.twitchcdn.net")
+# If set, the spade_url is not scraped from the channel page
+SPADE = os.environ.get("TWITCH_SPADE")
 CLIENT_ID = "kimne78kx3ncx6brgo4mv6wki5h1ko"
 DROP_ID = "c2542d6d-cd10-4532-919b-3d19f30a768b"
 
 
 class GQLOperations:
-    url = "https://gql.twitch.tv/gql"
+    url = GQL
     WithIsStreamLiveQuery = {
         "operationName": "WithIsStreamLiveQuery",
         "extensions": {
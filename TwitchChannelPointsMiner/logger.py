@@ -24,7 +24,7 @@ class EmojiFormatter(logging.Formatter):
             and record.emoji_is_present is False
         ):
             record.msg = emoji.emojize(
-                f"{record.emoji}  {record.msg.strip()}", use_aliases=True
+                f"{record.emoji}  {record.msg.strip()}", language="alias"
             )
             record.emoji_is_present = True
 
@@ -1,14 +1,20 @@
+import json
 import platform
 import re
-import time
 from copy import deepcopy
 from datetime import datetime, timezone
 from random import randrange
 
 from millify import millify
 
+from TwitchChannelPointsMiner.classes.Clock import Clock
 from TwitchChannelPointsMiner.constants.browser import USER_AGENTS
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 
 def _millify(input, precision=2):
     return millify(input, precision)
@@ -23,6 +29,11 @@ def get_streamer_index(streamers: list, channel_id) -> int:
         return -1
 
 
+# orjson is optional, much faster than json on the PubSub frames
+def json_loads(data):
+    return orjson.loads(data) if orjson is not None else json.loads(data)
+
+
 def float_round(number, ndigits=2):
     return round(float(number), ndigits)
 
@@ -32,7 +43,7 @@ def server_time(message_data):
         datetime.fromtimestamp(message_data["server_time"], timezone.utc).isoformat()
         + "Z"
         if message_data is not None and "server_time" in message_data
-        else datetime.fromtimestamp(time.time(), timezone.utc).isoformat() + "Z"
+        else datetime.fromtimestamp(Clock.time(), timezone.utc).isoformat() + "Z"
     )
 
 
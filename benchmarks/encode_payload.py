@@ -0,0 +1,78 @@
+# Micro-benchmark for Stream.encode_payload
+# Simulate one minute-watched tick for thousands of streams and compare the old behaviour
+# (json.dumps + base64 every tick) with the memoized payload.
+# Usage: python -m benchmarks.encode_payload [--streams 5000] [--ticks 10]
+
+import argparse
+import json
+import time
+import tracemalloc
+from base64 import b64encode
+
+from TwitchChannelPointsMiner.classes.entities.Stream import Stream
+
+
+def build_streams(count):
+    streams = []
+    for index in range(0, count):
+        stream = Stream()
+        stream.payload = [
+            {
+                "event": "minute-watched",
+                "properties": {
+                    "channel_id": str(100000 + index),
+                    "broadcast_id": str(40000000000 + index),
+                    "player": "site",
+                    "user_id": 123456789,
+                    "game": "Just Chatting",
+                },
+            }
+        ]
+        streams.append(stream)
+    return streams
+
+
+def encode_without_cache(stream):
+    json_event = json.dumps(stream.payload, separators=(",", ":"))
+    return {"data": (b64encode(json_event.encode("utf-8"))).decode("utf-8")}
+
+
+def measure(streams, ticks, encode):
+    tracemalloc.start()
+    start = time.perf_counter()
+    for tick in range(0, ticks):
+        # Keep the encoded payloads of the tick alive, as the pending requests would do
+        encoded = [encode(stream) for stream in streams]
+    del encoded
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+def run(streams_count=5000, ticks=10):
+    streams = build_streams(streams_count)
+    # Warm-up: the first call fills the cache, as the first tick after update_stream
+    for stream in streams:
+        stream.encode_payload()
+
+    results = {
+        "no-cache": measure(streams, ticks, encode_without_cache),
+        "cached": measure(streams, ticks, lambda stream: stream.encode_payload()),
+    }
+    for name, (elapsed, peak) in results.items():
+        print(
+            f"{name:>10}: {streams_count} streams x {ticks} ticks - "
+            f"{(elapsed / (streams_count * ticks)) * 1e6:.3f} us/encode, peak allocated per tick {peak / 1024:.1f} KiB"
+        )
+    return results
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(
+        description="Stream.encode_payload micro-benchmark"
+    )
+    arg_parser.add_argument("--streams", type=int, default=5000)
+    arg_parser.add_argument("--ticks", type=int, default=10)
+    args = arg_parser.parse_args()
+    run(args.streams, args.ticks)
@@ -0,0 +1,9 @@
+# Local stand-in for the Twitch endpoints used by the miner (GQL, Helix, passport, channel pages + spade, PubSub)
+# Usage: python -m benchmarks.fake_twitch --streamers 5000 [--latency 0.05] [--error-rate 0.01] [--script events.json]
+# then start the miner with the printed TWITCH_* environment variables.
+
+from benchmarks.fake_twitch.scenario import Scenario
+from benchmarks.fake_twitch.server import FakeTwitchServer, Faults
+from benchmarks.fake_twitch.state import FakeTwitch
+
+__all__ = ["FakeTwitch", "FakeTwitchServer", "Faults", "Scenario"]
@@ -0,0 +1,105 @@
+import argparse
+import logging
+import os
+import pickle
+from pathlib import Path
+
+from benchmarks.fake_twitch import FakeTwitch, FakeTwitchServer, Faults, Scenario
+
+
+# Same format of TwitchLogin.save_cookies, so the miner doesn't ask for the password
+def write_cookies(fake):
+    cookies_path = os.path.join(Path().absolute(), "cookies")
+    Path(cookies_path).mkdir(parents=True, exist_ok=True)
+    cookies_file = os.path.join(cookies_path, f"{fake.username}.pkl")
+    cookies = [
+        {"name": "auth-token", "value": "fake-auth-token"},
+        {"name": "persistent", "value": fake.user_id},
+    ]
+    with open(cookies_file, "wb") as f:
+        pickle.dump(cookies, f)
+    return cookies_file
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Fake Twitch backend")
+    arg_parser.add_argument("--host", default="127.0.0.1")
+    arg_parser.add_argument("--port", type=int, default=8080)
+    arg_parser.add_argument("--streamers", type=int, default=100)
+    arg_parser.add_argument(
+        "--online", type=float, default=0.3, help="Ratio of online streams at start"
+    )
+    arg_parser.add_argument(
+        "--followers", type=int, default=None, help="Followed channels (default all)"
+    )
+    arg_parser.add_argument("--username", default="fake-user")
+    arg_parser.add_argument("--seed", type=int, default=None)
+    arg_parser.add_argument(
+        "--latency", type=float, default=0, help="Seconds added to each response"
+    )
+    arg_parser.add_argument("--jitter", type=float, default=0)
+    arg_parser.add_argument(
+        "--error-rate", type=float, default=0, help="Ratio of 500 responses"
+    )
+    arg_parser.add_argument(
+        "--throttle-rate", type=float, default=0, help="Ratio of 429 responses"
+    )
+    arg_parser.add_argument("--script", default=None, help="JSON file of timed events")
+    arg_parser.add_argument(
+        "--no-random-events", action="store_true", help="Only the scripted events"
+    )
+    arg_parser.add_argument(
+        "--cookies",
+        action="store_true",
+        help="Write cookies/<username>.pkl, skip the login",
+    )
+    args = arg_parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(message)s")
+
+    fake = FakeTwitch(
+        streamers=args.streamers,
+        username=args.username,
+        online=args.online,
+        followers=args.followers,
+        seed=args.seed,
+    )
+    server = FakeTwitchServer(
+        fake,
+        host=args.host,
+        port=args.port,
+        faults=Faults(
+            latency=args.latency,
+            jitter=args.jitter,
+            error_rate=args.error_rate,
+            throttle_rate=args.throttle_rate,
+        ),
+    )
+    scenario = Scenario(
+        fake,
+        pubsub=server,
+        rates={} if args.no_random_events is True else None,
+        script=Scenario.load_script(args.script) if args.script is not None else [],
+    )
+
+    if args.cookies is True:
+        print(f"Cookies file: {write_cookies(fake)}")
+    print("Start the miner with:")
+    for key, value in server.environment().items():
+        print(f"export {key}={value}")
+
+    scenario.start()
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        scenario.stop()
+        server.server_close()
+        print(f"Requests: {dict(fake.requests)}")
+        print(f"PubSub messages published: {server.published}")
+        print(f"Faults injected: {server.faults.injected}")
+
+
+if __name__ == "__main__":
+    main()
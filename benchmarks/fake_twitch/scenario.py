@@ -0,0 +1,143 @@
+import heapq
+import itertools
+import json
+import logging
+import threading
+
+from TwitchChannelPointsMiner.classes.Clock import Clock
+
+logger = logging.getLogger(__name__)
+
+# Random events, average number for each channel per hour
+DEFAULT_RATES = {
+    "stream-up": 0.5,  # Offline channels
+    "stream-down": 0.5,  # Online channels
+    "claim-available": 4,  # Online channels
+    "raid": 0.2,  # Online channels
+    "prediction": 0.5,  # Online channels without a prediction
+}
+# Every online channel publish a viewcount each VIEWCOUNT_INTERVAL seconds
+VIEWCOUNT_INTERVAL = 30
+
+
+class Scenario:
+    """
+    Drive the fake backend: random events (Poisson-like, DEFAULT_RATES) and a script of timed events.
+    Script: JSON list of {"at": seconds, "event": name, "channel": login} or {"at": seconds, "topic": ..., "message": {...}},
+    events: stream-up, stream-down, viewcount, claim-available, raid, prediction, reconnect.
+    """
+
+    def __init__(self, fake, pubsub=None, rates: dict = None, script: list = []):
+        self.fake = fake
+        self.pubsub = pubsub
+        self.rates = rates if rates is not None else DEFAULT_RATES
+        self.started_at = Clock.time()
+        self.events = []
+        self.counter = itertools.count()
+        self.lock = threading.Lock()
+        self.running = False
+        for event in script:
+            self.schedule(event["at"], self.scripted, event)
+
+    @staticmethod
+    def load_script(filename):
+        with open(filename, encoding="utf-8") as f:
+            return json.load(f)
+
+    # `at` is relative to the start of the scenario
+    def schedule(self, at, function, *args):
+        with self.lock:
+            heapq.heappush(
+                self.events, (self.started_at + at, next(self.counter), function, args)
+            )
+
+    def scripted(self, event):
+        if "topic" in event:
+            self.fake.publish(event["topic"], event["message"])
+            return
+        if event["event"] == "reconnect":
+            if self.pubsub is not None:
+                self.pubsub.reconnect_all()
+            return
+        channel = self.fake.by_login[event["channel"]]
+        self.run_event(event["event"], channel)
+
+    def run_event(self, name, channel):
+        if name == "stream-up":
+            self.fake.stream_up(channel)
+        elif name == "stream-down":
+            self.fake.stream_down(channel)
+        elif name == "viewcount":
+            self.fake.viewcount(channel)
+        elif name == "claim-available":
+            self.fake.claim_available(channel)
+        elif name == "raid":
+            self.fake.raid(channel)
+        elif name == "prediction":
+            window = 120
+            event_id = self.fake.prediction_created(channel, window=window)
+            elapsed = Clock.time() - self.started_at
+            for delay in [30, 60, 90]:
+                self.schedule(elapsed + delay, self.fake.prediction_bets, event_id)
+            self.schedule(elapsed + window, self.fake.prediction_locked, event_id)
+            self.schedule(
+                elapsed + window + 30, self.fake.prediction_resolved, event_id
+            )
+
+    def candidates(self, name):
+        channels = self.fake.channels
+        if name == "stream-up":
+            return [channel for channel in channels if channel.online is False]
+        if name == "prediction":
+            return [
+                channel
+                for channel in channels
+                if channel.online is True and channel.prediction is None
+            ]
+        return [channel for channel in channels if channel.online is True]
+
+    def random_events(self, tick):
+        for name, rate in self.rates.items():
+            candidates = self.candidates(name)
+            expected = len(candidates) * rate / 3600
+            count = int(expected) + (
+                1 if self.fake.random.random() < expected % 1 else 0
+            )
+            for channel in self.fake.random.sample(
+                candidates, min(count, len(candidates))
+            ):
+                self.run_event(name, channel)
+
+        for channel in self.fake.channels:
+            if (
+                channel.online is True
+                and (channel.index + tick) % VIEWCOUNT_INTERVAL == 0
+            ):
+                self.fake.viewcount(channel)
+
+    def run(self):
+        self.running = True
+        for tick in itertools.count():
+            if self.running is False:
+                break
+            next_tick = self.started_at + tick + 1
+            try:
+                self.random_events(tick)
+                while True:
+                    with self.lock:
+                        if self.events == [] or self.events[0][0] > Clock.time():
+                            break
+                        _, _, function, args = heapq.heappop(self.events)
+                    function(*args)
+            except Exception:
+                logger.error("Exception raised by the scenario", exc_info=True)
+            Clock.sleep(max(0, next_tick - Clock.time()))
+
+    def start(self):
+        thread = threading.Thread(target=self.run, name="Scenario")
+        thread.daemon = True
+        thread.start()
+        return thread
+
+    def stop(self):
+        self.running = False
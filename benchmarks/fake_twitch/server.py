@@ -0,0 +1,291 @@
+import hashlib
+import json
+import logging
+import random
+import struct
+import threading
+import time
+import uuid
+from base64 import b64encode
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+logger = logging.getLogger(__name__)
+
+WEBSOCKET_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+MAX_TOPICS_PER_CONNECTION = 50
+
+
+class Faults:
+    """Latency (uniform between latency - jitter and latency + jitter) and errors injected in the HTTP responses"""
+
+    def __init__(self, latency=0, jitter=0, error_rate=0, throttle_rate=0):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.injected = {"errors": 0, "throttled": 0}
+
+    def delay(self):
+        delay = random.uniform(self.latency - self.jitter, self.latency + self.jitter)
+        if delay > 0:
+            time.sleep(delay)
+
+    # Return the status code to reply instead of the real response (None if no fault)
+    def error(self):
+        value = random.random()
+        if value < self.error_rate:
+            self.injected["errors"] += 1
+            return 500
+        if value < self.error_rate + self.throttle_rate:
+            self.injected["throttled"] += 1
+            return 429
+        return None
+
+
+class PubSubConnection:
+    # websocket frames (RFC 6455): the client frames are masked, the server frames are not
+    def __init__(self, server, rfile, wfile):
+        self.server = server
+        self.rfile = rfile
+        self.wfile = wfile
+        self.topics = set()
+        self.lock = threading.Lock()
+        self.closed = False
+
+    def read_frame(self):
+        header = self.rfile.read(2)
+        if len(header) < 2:
+            return None, None
+        opcode = header[0] & 0x0F
+        length = header[1] & 0x7F
+        if length == 126:
+            length = struct.unpack("!H", self.rfile.read(2))[0]
+        elif length == 127:
+            length = struct.unpack("!Q", self.rfile.read(8))[0]
+        mask = self.rfile.read(4) if header[1] & 0x80 else None
+        payload = self.rfile.read(length)
+        if mask is not None:
+            payload = bytes(
+                byte ^ mask[index % 4] for index, byte in enumerate(payload)
+            )
+        return opcode, payload
+
+    def send_frame(self, opcode, payload: bytes):
+        length = len(payload)
+        if length < 126:
+            header = struct.pack("!BB", 0x80 | opcode, length)
+        elif length < 2**16:
+            header = struct.pack("!BBH", 0x80 | opcode, 126, length)
+        else:
+            header = struct.pack("!BBQ", 0x80 | opcode, 127, length)
+        with self.lock:
+            if self.closed is True:
+                return
+            try:
+                self.wfile.write(header + payload)
+                self.wfile.flush()
+            except OSError:
+                self.closed = True
+
+    def send_json(self, data):
+        self.send_frame(0x1, json.dumps(data).encode("utf-8"))
+
+    def serve(self):
+        self.server.listen(self, [])
+        while self.closed is False:
+            opcode, payload = self.read_frame()
+            if opcode is None or opcode == 0x8:
+                break
+            if opcode == 0x9:
+                self.send_frame(0xA, payload)
+            elif opcode == 0x1:
+                self.handle(json.loads(payload.decode("utf-8")))
+        self.closed = True
+        self.server.unlisten(self, list(self.topics))
+
+    def handle(self, request):
+        if request["type"] == "PING":
+            self.send_json({"type": "PONG"})
+        elif request["type"] in ["LISTEN", "UNLISTEN"]:
+            topics = request.get("data", {}).get("topics", [])
+            error = ""
+            if request["type"] == "UNLISTEN":
+                self.server.unlisten(self, topics)
+            elif len(self.topics | set(topics)) > MAX_TOPICS_PER_CONNECTION:
+                error = "ERR_BADMESSAGE"
+            elif self.server.faults.error() is not None:
+                error = "ERR_SERVER"
+            else:
+                self.server.listen(self, topics)
+            self.send_json(
+                {"type": "RESPONSE", "nonce": request.get("nonce", ""), "error": error}
+            )
+
+
+class FakeTwitchServer(ThreadingHTTPServer):
+    """
+    One port for everything: GQL (/gql), Helix (/helix/...), passport (/login), channel pages + settings.js + spade,
+    PubSub websocket (/v1). Point the miner here with the TWITCH_* environment variables (see environment()).
+    """
+
+    daemon_threads = True
+    request_queue_size = 256
+
+    def __init__(self, fake, host="127.0.0.1", port=8080, faults: Faults = None):
+        super().__init__((host, port), FakeTwitchHandler)
+        self.fake = fake
+        self.faults = faults if faults is not None else Faults()
+        self.base_url = f"http://{host}:{self.server_address[1]}"
+        self.subscriptions = {}
+        self.connections = set()
+        self.subscriptions_lock = threading.Lock()
+        self.published = 0
+        fake.listeners.append(self.publish)
+
+    def environment(self) -> dict:
+        return {
+            "TWITCH_URL": self.base_url,
+            "TWITCH_API": self.base_url,
+            "TWITCH_GQL": f"{self.base_url}/gql",
+            "TWITCH_PASSPORT": self.base_url,
+            "TWITCH_STATIC": self.base_url,
+            "TWITCH_WEBSOCKET": f"{self.base_url.replace('http://', 'ws://')}/v1",
+        }
+
+    def listen(self, connection, topics):
+        with self.subscriptions_lock:
+            self.connections.add(connection)
+            for topic in topics:
+                connection.topics.add(topic)
+                self.subscriptions.setdefault(topic, set()).add(connection)
+
+    def unlisten(self, connection, topics):
+        with self.subscriptions_lock:
+            for topic in topics:
+                connection.topics.discard(topic)
+                self.subscriptions.get(topic, set()).discard(connection)
+            if connection.closed is True:
+                self.connections.discard(connection)
+
+    def publish(self, topic, message):
+        frame = {
+            "type": "MESSAGE",
+            "data": {"topic": topic, "message": json.dumps(message)},
+        }
+        with self.subscriptions_lock:
+            connections = list(self.subscriptions.get(topic, []))
+        for connection in connections:
+            connection.send_json(frame)
+            self.published += 1
+
+    # Ask every client to reconnect (Twitch does it before a maintenance)
+    def reconnect_all(self):
+        with self.subscriptions_lock:
+            connections = list(self.connections)
+        for connection in connections:
+            connection.send_json({"type": "RECONNECT"})
+
+
+class FakeTwitchHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        logger.debug(format % args)
+
+    def reply(self, status, body=b"", content_type="application/json", headers={}):
+        if isinstance(body, (dict, list)):
+            body = json.dumps(body).encode("utf-8")
+        elif isinstance(body, str):
+            body = body.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for key, value in headers.items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def read_body(self):
+        length = int(self.headers.get("Content-Length", 0))
+        return self.rfile.read(length) if length > 0 else b""
+
+    # Latency and errors, return True if the request was already answered
+    def inject_faults(self):
+        self.server.faults.delay()
+        status = self.server.faults.error()
+        if status == 429:
+            self.reply(
+                status,
+                {"error": "Too Many Requests", "status": 429},
+                headers={
+                    "Retry-After": "1",
+                    "Ratelimit-Limit": "800",
+                    "Ratelimit-Remaining": "0",
+                    "Ratelimit-Reset": str(int(time.time()) + 1),
+                },
+            )
+        elif status is not None:
+            self.reply(status, {"error": "Internal Server Error", "status": status})
+        return status is not None
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path == "/v1" and self.headers.get("Upgrade", "").lower() == "websocket":
+            return self.websocket()
+
+        if self.inject_faults() is True:
+            return
+        fake = self.server.fake
+        if url.path.startswith("/helix/"):
+            status, body = fake.helix(url.path[len("/helix") :], parse_qs(url.query))
+            self.reply(status, body)
+        elif url.path.startswith("/config/settings."):
+            self.reply(
+                200,
+                f'window.__twilightSettings = {{"spade_url":"{self.server.base_url}/spade"}}',
+                content_type="application/javascript",
+            )
+        elif url.path.strip("/") in fake.by_login:
+            self.reply(
+                200,
+                f'<html><script src="{self.server.base_url}/config/settings.fake.js"></script></html>',
+                content_type="text/html",
+            )
+        else:
+            self.reply(404, {"error": "Not Found", "status": 404})
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        body = self.read_body()
+        if self.inject_faults() is True:
+            return
+        fake = self.server.fake
+        if url.path == "/gql":
+            operations = json.loads(body)
+            if isinstance(operations, list):
+                self.reply(200, [fake.gql(operation) for operation in operations])
+            else:
+                self.reply(200, fake.gql(operations))
+        elif url.path == "/spade":
+            data = parse_qs(body.decode("utf-8"))
+            valid = fake.minute_watched({key: value[0] for key, value in data.items()})
+            self.reply(204 if valid is True else 400)
+        elif url.path == "/login":
+            self.reply(200, {"access_token": uuid.uuid4().hex, "redirect_path": "/"})
+        else:
+            self.reply(404, {"error": "Not Found", "status": 404})
+
+    def websocket(self):
+        key = self.headers["Sec-WebSocket-Key"]
+        accept = b64encode(
+            hashlib.sha1((key + WEBSOCKET_GUID).encode("utf-8")).digest()
+        ).decode("utf-8")
+        self.send_response(101)
+        self.send_header("Upgrade", "websocket")
+        self.send_header("Connection", "Upgrade")
+        self.send_header("Sec-WebSocket-Accept", accept)
+        self.end_headers()
+        self.wfile.flush()
+        PubSubConnection(self.server, self.rfile, self.wfile).serve()
+        self.close_connection = True
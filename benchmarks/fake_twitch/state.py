@@ -0,0 +1,526 @@
+import itertools
+import json
+import random
+import threading
+import uuid
+from base64 import b64decode
+from collections import Counter
+from datetime import datetime, timezone
+
+from TwitchChannelPointsMiner.classes.Clock import Clock
+from TwitchChannelPointsMiner.constants.twitch import DROP_ID
+
+GAMES = [
+    {"id": "509658", "name": "Just Chatting", "displayName": "Just Chatting"},
+    {"id": "21779", "name": "League of Legends", "displayName": "League of Legends"},
+    {"id": "32982", "name": "Grand Theft Auto V", "displayName": "Grand Theft Auto V"},
+]
+
+
+# The messages are deduplicated by (type, topic, channel, timestamp): with a virtual clock many messages
+# share the same instant, a microsecond for each message keeps them distinct
+TIMESTAMP_COUNTER = itertools.count()
+
+
+def timestamp():
+    now = Clock.time() + (next(TIMESTAMP_COUNTER) % 1000) / 10**6
+    return datetime.fromtimestamp(now, timezone.utc).isoformat().replace("+00:00", "Z")
+
+
+class FakeChannel:
+    def __init__(self, index, rng):
+        self.index = index
+        self.id = str(100000 + index)
+        self.login = f"streamer{index:05d}"
+        self.online = False
+        self.broadcast_id = None
+        self.viewers = 0
+        self.game = GAMES[index % len(GAMES)]
+        # One channel out of ten has the drops enabled, the user is subscribed to one channel out of seven
+        self.drops_enabled = index % 10 == 0
+        self.multiplier = 0.2 if index % 7 == 0 else 0
+        self.balance = rng.randint(0, 100000)
+        self.claim_id = None
+        self.prediction = None
+        self.minutes_watched = 0
+        self.broadcast_minutes = 0
+
+    def stream_info(self):
+        return {
+            "id": self.id,
+            "login": self.login,
+            "broadcastSettings": {
+                "id": self.id,
+                "title": f"Fake stream of {self.login}",
+                "game": self.game,
+            },
+            "stream": (
+                {
+                    "id": self.broadcast_id,
+                    "viewersCount": self.viewers,
+                    "tags": (
+                        [{"id": DROP_ID, "localizedName": "Drops Enabled"}]
+                        if self.drops_enabled is True
+                        else []
+                    ),
+                }
+                if self.online is True
+                else None
+            ),
+        }
+
+
+class FakeTwitch:
+    """
+    State of the fake backend: channels, channel points, predictions and drops of a single user.
+    The GQL / Helix responses have the same shape of the Twitch ones (only the fields read by the miner),
+    every state change is published to the PubSub listeners as Twitch does.
+    """
+
+    def __init__(
+        self,
+        streamers: int = 100,
+        username: str = "fake-user",
+        user_id: int = 123456789,
+        online: float = 0.3,
+        followers: int = None,
+        seed: int = None,
+    ):
+        self.random = random.Random(seed)
+        self.username = username
+        self.user_id = str(user_id)
+        self.lock = threading.RLock()
+        self.requests = Counter()
+        self.listeners = []
+
+        self.channels = [FakeChannel(index, self.random) for index in range(streamers)]
+        self.by_login = {channel.login: channel for channel in self.channels}
+        self.by_id = {channel.id: channel for channel in self.channels}
+        self.followers = self.channels[
+            : followers if followers is not None else streamers
+        ]
+        for channel in self.random.sample(self.channels, int(streamers * online)):
+            self.stream_up(channel, publish=False)
+
+        self.predictions = {}
+        self.drops = [
+            {
+                "id": f"drop-{minutes}",
+                "required": minutes,
+                "current": 0,
+                "claimed": False,
+            }
+            for minutes in [15, 30, 60]
+        ]
+
+    def publish(self, topic, message):
+        for listener in self.listeners:
+            listener(topic, message)
+
+    # GQL persisted operations
+    def gql(self, operation):
+        name = operation.get("operationName")
+        variables = operation.get("variables", {})
+        self.requests[name] += 1
+        handler = getattr(self, f"gql_{name}", None)
+        if handler is None:
+            return {"errors": [{"message": "PersistedQueryNotFound"}]}
+        with self.lock:
+            return {"data": handler(variables)}
+
+    def gql_VideoPlayerStreamInfoOverlayChannel(self, variables):
+        channel = self.by_login.get(variables.get("channel"))
+        return {"user": channel.stream_info() if channel is not None else None}
+
+    def gql_WithIsStreamLiveQuery(self, variables):
+        channel = self.by_id.get(str(variables.get("id")))
+        if channel is None:
+            return {"user": None}
+        stream = {"id": channel.broadcast_id} if channel.online is True else None
+        return {"user": {"id": channel.id, "stream": stream}}
+
+    def gql_ChannelPointsContext(self, variables):
+        channel = self.by_login.get(variables.get("channelLogin"))
+        if channel is None:
+            return {"community": None}
+        claim = {"id": channel.claim_id} if channel.claim_id is not None else None
+        return {
+            "community": {
+                "id": channel.id,
+                "channel": {
+                    "id": channel.id,
+                    "self": {
+                        "communityPoints": {
+                            "balance": channel.balance,
+                            "availableClaim": claim,
+                            "activeMultipliers": (
+                                [{"factor": channel.multiplier, "reasonCode": "SUB_T1"}]
+                                if channel.multiplier > 0
+                                else []
+                            ),
+                        }
+                    },
+                },
+            }
+        }
+
+    def gql_ModViewChannelQuery(self, variables):
+        return {"user": {"self": {"isModerator": False}}}
+
+    def gql_ClaimCommunityPoints(self, variables):
+        channel = self.by_id.get(str(variables["input"]["channelID"]))
+        claim_id = variables["input"]["claimID"]
+        if channel is None or channel.claim_id != claim_id:
+            return {"claimCommunityPoints": {"error": {"code": "NOT_FOUND"}}}
+        channel.claim_id = None
+        self.points_earned(channel, 50, "CLAIM")
+        return {
+            "claimCommunityPoints": {
+                "claim": {"id": claim_id},
+                "currentPoints": channel.balance,
+                "error": None,
+            }
+        }
+
+    def gql_JoinRaid(self, variables):
+        return {"joinRaid": {"raidID": variables["input"]["raidID"]}}
+
+    def gql_MakePrediction(self, variables):
+        event_id = variables["input"]["eventID"]
+        prediction = self.predictions.get(event_id)
+        if prediction is None or prediction["status"] != "ACTIVE":
+            return {"makePrediction": {"error": {"code": "EVENT_NOT_ACTIVE"}}}
+        prediction["user"] = {
+            "outcome_id": variables["input"]["outcomeID"],
+            "points": variables["input"]["points"],
+        }
+        self.publish(
+            f"predictions-user-v1.{self.user_id}",
+            {
+                "type": "prediction-made",
+                "data": {
+                    "timestamp": timestamp(),
+                    "prediction": {
+                        "id": str(uuid.uuid4()),
+                        "event_id": event_id,
+                        "channel_id": prediction["channel_id"],
+                        "outcome_id": variables["input"]["outcomeID"],
+                        "points": variables["input"]["points"],
+                    },
+                },
+            },
+        )
+        return {"makePrediction": {"prediction": {"id": event_id}, "error": None}}
+
+    def gql_Inventory(self, variables):
+        return {
+            "currentUser": {
+                "inventory": {
+                    "dropCampaignsInProgress": [
+                        {
+                            "id": "campaign-1",
+                            "name": "Fake campaign",
+                            "game": GAMES[0],
+                            "timeBasedDrops": [
+                                {
+                                    "id": drop["id"],
+                                    "requiredMinutesWatched": drop["required"],
+                                    "self": {
+                                        "currentMinutesWatched": drop["current"],
+                                        "isClaimed": drop["claimed"],
+                                        "dropInstanceID": (
+                                            f"{self.user_id}#campaign-1#{drop['id']}"
+                                            if drop["current"] >= drop["required"]
+                                            and drop["claimed"] is False
+                                            else None
+                                        ),
+                                    },
+                                }
+                                for drop in self.drops
+                            ],
+                        }
+                    ]
+                }
+            }
+        }
+
+    def gql_DropsPage_ClaimDropRewards(self, variables):
+        drop_id = variables["input"]["dropInstanceID"].split("#")[-1]
+        for drop in self.drops:
+            if drop["id"] == drop_id and drop["current"] >= drop["required"]:
+                drop["claimed"] = True
+                return {"claimDropRewards": {"status": "ELIGIBLE_FOR_ALL"}}
+        return {"claimDropRewards": None}
+
+    # Helix: /users?login=...&login=... and /users/follows?from_id=...&first=...&after=...
+    def helix(self, path, query):
+        self.requests[f"helix{path}"] += 1
+        if path == "/users":
+            users = []
+            for login in query.get("login", []):
+                if login == self.username:
+                    users.append({"id": self.user_id, "login": login})
+                elif login in self.by_login:
+                    users.append({"id": self.by_login[login].id, "login": login})
+            return 200, {"data": users}
+        if path == "/users/follows":
+            first = int(query.get("first", ["20"])[0])
+            after = int(query.get("after", ["0"])[0])
+            page = self.followers[after : after + first]
+            more = after + first < len(self.followers)
+            return 200, {
+                "total": len(self.followers),
+                "data": [
+                    {
+                        "to_id": channel.id,
+                        "to_login": channel.login,
+                        "to_name": channel.login,
+                    }
+                    for channel in page
+                ],
+                "pagination": {"cursor": str(after + first)} if more is True else {},
+            }
+        return 404, {"error": "Not Found", "status": 404}
+
+    # minute-watched events: points every 5 minutes, a watch streak bonus after the first 5 minutes of a broadcast,
+    # progress of the drops if the game is sent
+    def minute_watched(self, body):
+        self.requests["spade"] += 1
+        try:
+            events = json.loads(b64decode(body["data"]).decode("utf-8"))
+        except (KeyError, ValueError):
+            return False
+        with self.lock:
+            for event in events:
+                properties = event.get("properties", {})
+                channel = self.by_id.get(str(properties.get("channel_id")))
+                if channel is None or channel.online is False:
+                    continue
+                channel.minutes_watched += 1
+                channel.broadcast_minutes += 1
+                if channel.minutes_watched % 5 == 0:
+                    self.points_earned(
+                        channel, int(10 * (1 + channel.multiplier)), "WATCH"
+                    )
+                if channel.broadcast_minutes == 5:
+                    self.points_earned(channel, 350, "WATCH_STREAK")
+                if (
+                    channel.drops_enabled is True
+                    and channel.game["name"] == GAMES[0]["name"]
+                    and "game" in properties
+                ):
+                    self.drop_progress(channel)
+        return True
+
+    def points_earned(self, channel, points, reason_code):
+        channel.balance += points
+        self.publish(
+            f"community-points-user-v1.{self.user_id}",
+            {
+                "type": "points-earned",
+                "data": {
+                    "timestamp": timestamp(),
+                    "channel_id": channel.id,
+                    "point_gain": {
+                        "user_id": self.user_id,
+                        "channel_id": channel.id,
+                        "total_points": points,
+                        "baseline_points": points,
+                        "reason_code": reason_code,
+                        "multipliers": (
+                            [{"factor": channel.multiplier, "reason_code": "SUB_T1"}]
+                            if channel.multiplier > 0
+                            else []
+                        ),
+                    },
+                    "balance": {
+                        "user_id": self.user_id,
+                        "channel_id": channel.id,
+                        "balance": channel.balance,
+                    },
+                },
+            },
+        )
+
+    def drop_progress(self, channel):
+        for drop in self.drops:
+            if drop["claimed"] is False and drop["current"] < drop["required"]:
+                drop["current"] += 1
+                self.publish(
+                    f"user-drop-events.{self.user_id}",
+                    {
+                        "type": "drop-progress",
+                        "data": {
+                            "drop_id": drop["id"],
+                            "channel_id": channel.id,
+                            "current_progress_min": drop["current"],
+                            "required_progress_min": drop["required"],
+                        },
+                    },
+                )
+
+    # Scripted / random events
+    def stream_up(self, channel, publish=True):
+        with self.lock:
+            channel.online = True
+            channel.broadcast_id = str(40000000000 + self.random.randrange(10**9))
+            channel.viewers = self.random.randint(1, 50000)
+            channel.broadcast_minutes = 0
+        if publish is True:
+            self.publish(
+                f"video-playback-by-id.{channel.id}",
+                {"type": "stream-up", "server_time": Clock.time(), "play_delay": 0},
+            )
+
+    def stream_down(self, channel):
+        with self.lock:
+            channel.online = False
+            channel.claim_id = None
+        self.publish(
+            f"video-playback-by-id.{channel.id}",
+            {"type": "stream-down", "server_time": Clock.time()},
+        )
+
+    def viewcount(self, channel):
+        channel.viewers = max(1, channel.viewers + self.random.randint(-100, 100))
+        self.publish(
+            f"video-playback-by-id.{channel.id}",
+            {
+                "type": "viewcount",
+                "server_time": Clock.time(),
+                "viewers": channel.viewers,
+            },
+        )
+
+    def claim_available(self, channel):
+        with self.lock:
+            channel.claim_id = str(uuid.uuid4())
+        self.publish(
+            f"community-points-user-v1.{self.user_id}",
+            {
+                "type": "claim-available",
+                "data": {
+                    "timestamp": timestamp(),
+                    "claim": {
+                        "id": channel.claim_id,
+                        "user_id": self.user_id,
+                        "channel_id": channel.id,
+                        "point_gain": {"total_points": 50, "reason_code": "CLAIM"},
+                        "created_at": timestamp(),
+                    },
+                },
+            },
+        )
+
+    def raid(self, channel):
+        target = self.random.choice(self.channels)
+        self.publish(
+            f"raid.{channel.id}",
+            {
+                "type": "raid_update_v2",
+                "raid": {
+                    "id": str(uuid.uuid4()),
+                    "creator_id": channel.id,
+                    "source_id": channel.id,
+                    "target_id": target.id,
+                    "target_login": target.login,
+                    "target_display_name": target.login,
+                    "transition_jitter_seconds": 5,
+                    "force_raid_now_seconds": 90,
+                    "viewer_count": channel.viewers,
+                },
+            },
+        )
+
+    # Return the prediction window (seconds): the caller schedule the lock and the result
+    def prediction_created(self, channel, window=120):
+        event_id = str(uuid.uuid4())
+        outcomes = [
+            {
+                "id": str(uuid.uuid4()),
+                "color": color,
+                "title": title,
+                "total_points": 0,
+                "total_users": 0,
+                "top_predictors": [],
+                "badge": {"version": color.lower(), "set_id": "predictions"},
+            }
+            for color, title in [("BLUE", "Yes"), ("PINK", "No")]
+        ]
+        with self.lock:
+            channel.prediction = event_id
+            self.predictions[event_id] = {
+                "id": event_id,
+                "channel_id": channel.id,
+                "created_at": timestamp(),
+                "title": f"Fake prediction on {channel.login}?",
+                "status": "ACTIVE",
+                "prediction_window_seconds": window,
+                "outcomes": outcomes,
+                "user": None,
+            }
+        self.publish_prediction(event_id, "event-created")
+        return event_id
+
+    def prediction_bets(self, event_id):
+        with self.lock:
+            for outcome in self.predictions[event_id]["outcomes"]:
+                outcome["total_users"] += self.random.randint(1, 100)
+                outcome["total_points"] += self.random.randint(100, 100000)
+        self.publish_prediction(event_id, "event-updated")
+
+    def prediction_locked(self, event_id):
+        with self.lock:
+            self.predictions[event_id]["status"] = "LOCKED"
+        self.publish_prediction(event_id, "event-updated")
+
+    def prediction_resolved(self, event_id):
+        with self.lock:
+            prediction = self.predictions.pop(event_id)
+            prediction["status"] = "RESOLVED"
+            winner = self.random.choice(prediction["outcomes"])
+            prediction["winning_outcome_id"] = winner["id"]
+            self.by_id[prediction["channel_id"]].prediction = None
+        self.publish_prediction(event_id, "event-updated", prediction)
+
+        user = prediction["user"]
+        if user is not None:
+            won = user["outcome_id"] == winner["id"]
+            points = (
+                int(
+                    user["points"]
+                    * sum(outcome["total_points"] for outcome in prediction["outcomes"])
+                    / max(1, winner["total_points"])
+                )
+                if won is True
+                else 0
+            )
+            self.publish(
+                f"predictions-user-v1.{self.user_id}",
+                {
+                    "type": "prediction-result",
+                    "data": {
+                        "timestamp": timestamp(),
+                        "prediction": {
+                            "event_id": event_id,
+                            "channel_id": prediction["channel_id"],
+                            "result": {
+                                "type": "WIN" if won is True else "LOSE",
+                                "points_won": points if won is True else None,
+                            },
+                        },
+                    },
+                },
+            )
+
+    def publish_prediction(self, event_id, message_type, prediction=None):
+        with self.lock:
+            prediction = (
+                prediction if prediction is not None else self.predictions[event_id]
+            )
+            event = {key: value for key, value in prediction.items() if key != "user"}
+            event = json.loads(json.dumps(event))
+        self.publish(
+            f"predictions-channel-v1.{prediction['channel_id']}",
+            {"type": message_type, "data": {"timestamp": timestamp(), "event": event}},
+        )
@@ -0,0 +1,170 @@
+# Benchmark for the PubSub decoding path (frames/s)
+# Compare the old behaviour (json.loads of the frame + eager Message with a second json.loads)
+# with PubSubDecoder (peek + skip + lazy Message), with and without orjson.
+# The frames are synthetic (same mix of a busy account: mostly viewcount) or read from a recording (PubSubRecorder).
+# Usage: python -m benchmarks.pubsub_decoding [--frames 200000] [--file recording.txt]
+
+import argparse
+import json
+import random
+import time
+
+from TwitchChannelPointsMiner import utils
+from TwitchChannelPointsMiner.classes.PubSubDecoder import PubSubDecoder
+from TwitchChannelPointsMiner.classes.PubSubRecorder import PubSubRecorder
+
+# (topic, nested message, weight)
+TRAFFIC = [
+    (
+        "video-playback-by-id",
+        {"type": "viewcount", "server_time": 1621012345.123, "viewers": 1234},
+        70,
+    ),
+    (
+        "video-playback-by-id",
+        {"type": "commercial", "server_time": 1621012345.123, "length": 90},
+        5,
+    ),
+    (
+        "community-points-user-v1",
+        {
+            "type": "points-earned",
+            "data": {
+                "timestamp": "2021-05-14T17:12:25.123456789Z",
+                "channel_id": "{channel_id}",
+                "point_gain": {
+                    "user_id": "123456789",
+                    "channel_id": "{channel_id}",
+                    "total_points": 10,
+                    "baseline_points": 10,
+                    "reason_code": "WATCH",
+                    "multipliers": [],
+                },
+                "balance": {
+                    "user_id": "123456789",
+                    "channel_id": "{channel_id}",
+                    "balance": 12345,
+                },
+            },
+        },
+        10,
+    ),
+    (
+        "community-points-user-v1",
+        {
+            "type": "claim-available",
+            "data": {
+                "timestamp": "2021-05-14T17:12:25.123456789Z",
+                "claim": {"id": "abcdef", "channel_id": "{channel_id}"},
+            },
+        },
+        2,
+    ),
+    (
+        "raid",
+        {
+            "type": "raid_update_v2",
+            "raid": {"id": "abcdef", "target_login": "target", "viewer_count": 100},
+        },
+        3,
+    ),
+    (
+        "predictions-channel-v1",
+        {
+            "type": "event-updated",
+            "data": {
+                "timestamp": "2021-05-14T17:12:25.123456789Z",
+                "event": {
+                    "id": "abcdef",
+                    "channel_id": "{channel_id}",
+                    "status": "ACTIVE",
+                    "outcomes": [
+                        {"id": "1", "total_points": 1000, "total_users": 10},
+                        {"id": "2", "total_points": 2000, "total_users": 20},
+                    ],
+                },
+            },
+        },
+        10,
+    ),
+]
+
+
+def build_frames(count, channels=200):
+    random.seed(0)
+    frames = []
+    weights = [weight for _, _, weight in TRAFFIC]
+    for _ in range(0, count):
+        topic, message, _ = random.choices(TRAFFIC, weights=weights)[0]
+        channel_id = str(100000 + random.randrange(0, channels))
+        nested = json.dumps(message).replace("{channel_id}", channel_id)
+        frames.append(
+            json.dumps(
+                {
+                    "type": "MESSAGE",
+                    "data": {"topic": f"{topic}.{channel_id}", "message": nested},
+                }
+            )
+        )
+    return frames
+
+
+def read_frames(filename):
+    return [frame for _, frame in PubSubRecorder.read(filename)]
+
+
+# The old on_message path: everything decoded for every frame
+def decode_eager(frame):
+    response = json.loads(frame)
+    if response["type"] == "MESSAGE":
+        data = response["data"]
+        topic, topic_user = data["topic"].split(".")
+        message = json.loads(data["message"])
+        message_data = message["data"] if "data" in message else None
+        timestamp = utils.server_time(message if message_data is None else message_data)
+        return f"{message['type']}.{topic}.{topic_user}", timestamp
+    return response
+
+
+def measure(frames, decode):
+    start = time.perf_counter()
+    for frame in frames:
+        decode(frame)
+    return len(frames) / (time.perf_counter() - start)
+
+
+def run(frames):
+    # As a running miner, the viewcount messages are dropped when the streams were refreshed recently
+    decoder = PubSubDecoder(
+        skip=lambda topic, topic_user, message_type: message_type == "viewcount"
+    )
+
+    def decode_lazy(frame):
+        frame_type, message = decoder.decode(frame)
+        if frame_type == "MESSAGE" and message is not None:
+            # Dedup key, always computed for the handled messages
+            return message.identifier, message.timestamp
+        return message
+
+    orjson = utils.orjson
+    results = {"eager json": measure(frames, decode_eager)}
+    utils.orjson = None
+    results["decoder json"] = measure(frames, decode_lazy)
+    utils.orjson = orjson
+    if orjson is not None:
+        results["decoder orjson"] = measure(frames, decode_lazy)
+
+    for name, frames_per_second in results.items():
+        print(f"{name:>15}: {frames_per_second:,.0f} frames/s")
+    print(f"Decoder stats: {decoder.stats()}")
+    return results
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description="PubSub decoding benchmark")
+    arg_parser.add_argument("--frames", type=int, default=200000)
+    arg_parser.add_argument(
+        "--file", help="Recording made by PubSubRecorder", default=None
+    )
+    args = arg_parser.parse_args()
+    run(read_frames(args.file) if args.file is not None else build_frames(args.frames))
@@ -0,0 +1,178 @@
+# Replay a PubSub recording (see PubSubRecorder) through the WebSocketsPool handlers, without network access.
+# Twitch and TwitchBrowser are stubbed, each frame goes through on_message -> decoder -> dedup -> dispatcher -> process_message.
+# Report the throughput (frames/s) and the dispatcher latencies, the numbers are repeatable for the same recording.
+# Usage: python -m benchmarks.pubsub_replay recording.txt [--speed 1] (--speed 0 = as fast as possible)
+
+import argparse
+import time
+from collections import Counter
+
+from TwitchChannelPointsMiner.classes.DropsClaimer import DropsClaimer
+from TwitchChannelPointsMiner.classes.DropsTracker import DropsTracker
+from TwitchChannelPointsMiner.classes.entities.Message import Message
+from TwitchChannelPointsMiner.classes.entities.Streamer import (
+    Streamer,
+    StreamerSettings,
+)
+from TwitchChannelPointsMiner.classes.PubSubRecorder import PubSubRecorder
+from TwitchChannelPointsMiner.classes.RefreshCoordinator import RefreshCoordinator
+from TwitchChannelPointsMiner.classes.Settings import Settings
+from TwitchChannelPointsMiner.classes.StreamersIndex import StreamersIndex
+from TwitchChannelPointsMiner.classes.WatchScheduler import WatchScheduler
+from TwitchChannelPointsMiner.classes.WebSocketsPool import WebSocketsPool
+from TwitchChannelPointsMiner.logger import LoggerSettings
+from TwitchChannelPointsMiner.utils import json_loads
+
+
+class StubTwitch:
+    def __init__(self):
+        self.calls = Counter()
+        self.drops_tracker = DropsTracker()
+        self.watch_scheduler = WatchScheduler(drops_tracker=self.drops_tracker)
+        self.drops_claimer = DropsClaimer(self.claim_drop, workers=0)
+        self.refresh_coordinator = RefreshCoordinator(self.watch_scheduler)
+
+    def claim_bonus(self, streamer, claim_id):
+        self.calls["claim_bonus"] += 1
+
+    def check_streamer_online(self, streamer, stream_info_response=None):
+        self.calls["check_streamer_online"] += 1
+
+    def update_raid(self, streamer, raid):
+        self.calls["update_raid"] += 1
+
+    def load_drops_campaigns(self, not_before=None):
+        self.calls["load_drops_campaigns"] += 1
+
+    def search_drop_in_inventory(self, streamer, drop_id, not_before=None):
+        self.calls["search_drop_in_inventory"] += 1
+        return {"dropInstanceID": None}
+
+    def claim_drop(self, drop_instance_id, streamer):
+        self.calls["claim_drop"] += 1
+        return True
+
+
+class StubBrowser:
+    class Driver:
+        current_url = "about:blank"
+
+    def __init__(self):
+        self.currently_is_betting = False
+        self.browser = StubBrowser.Driver()
+        self.calls = Counter()
+
+    # The bet is never started, the event is removed from the pool
+    def start_bet(self, event):
+        self.calls["start_bet"] += 1
+        return False, 0
+
+    def place_bet(self, event):
+        self.calls["place_bet"] += 1
+
+
+class StubWebSocket:
+    def __init__(self, parent_pool):
+        self.parent_pool = parent_pool
+        self.streamers_index = parent_pool.streamers_index
+        self.last_pong = time.time()
+        self.listen_responses = 0
+
+    def handle_listen_response(self, response):
+        self.listen_responses += 1
+
+
+class ReplayPool(WebSocketsPool):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.reconnections = 0
+
+    # No connections to replace
+    def reconnect(self, ws, make_before_break=False):
+        self.reconnections += 1
+
+
+# A Streamer for each channel_id found in the recording
+def build_streamers(frames):
+    streamers_index = StreamersIndex()
+    streamers = []
+    for _, frame in frames:
+        response = json_loads(frame)
+        if response["type"] != "MESSAGE":
+            continue
+        channel_id = str(Message(response["data"]).channel_id)
+        if streamers_index.get_by_channel_id(channel_id) is None:
+            settings = StreamerSettings()
+            settings.default()
+            settings.bet.default()
+            streamer = Streamer(f"streamer-{channel_id}", settings=settings)
+            streamer.channel_id = channel_id
+            streamers.append(streamer)
+            streamers_index.add(streamer)
+    return streamers, streamers_index
+
+
+def replay(filename, speed=0):
+    frames = list(PubSubRecorder.read(filename))
+    if frames == []:
+        print(f"No frames in {filename}")
+        return None
+
+    # The handlers log with the streamers repr, no log files
+    Settings.logger = LoggerSettings(save=False)
+    streamers, streamers_index = build_streamers(frames)
+    twitch, browser = StubTwitch(), StubBrowser()
+    pool = ReplayPool(
+        twitch=twitch,
+        browser=browser,
+        streamers=streamers,
+        streamers_index=streamers_index,
+        events_predictions={},
+    )
+    ws = StubWebSocket(pool)
+
+    first_received_at = frames[0][0]
+    start = time.perf_counter()
+    for received_at, frame in frames:
+        if speed > 0:
+            delay = (received_at - first_received_at) / speed - (
+                time.perf_counter() - start
+            )
+            if delay > 0:
+                time.sleep(delay)
+        WebSocketsPool.on_message(ws, frame)
+    fed = time.perf_counter() - start
+
+    # Wait the handlers
+    for queues in pool.dispatcher.queues.values():
+        for message_queue in queues:
+            message_queue.join()
+    drained = time.perf_counter() - start
+
+    print(
+        f"{len(frames)} frames, {len(streamers)} channels - "
+        f"on_message: {len(frames) / fed:,.0f} frames/s, end to end: {len(frames) / drained:,.0f} frames/s"
+    )
+    for family, stats in pool.dispatcher.stats().items():
+        if stats["processed"] > 0 or stats["dropped"] > 0:
+            print(
+                f"{family:>12}: processed {stats['processed']}, dropped {stats['dropped']}, "
+                f"avg wait {stats['avg_wait']}s, avg latency {stats['avg_latency']}s, max {stats['max_latency']}s"
+            )
+    print(f"Decoder: {pool.decoder.stats()}")
+    print(f"Dedup: {pool.dedup.stats()}, RECONNECT frames: {pool.reconnections}")
+    print(f"Twitch calls: {dict(twitch.calls)}, Browser calls: {dict(browser.calls)}")
+    return pool
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description="PubSub offline replay")
+    arg_parser.add_argument("filename", help="Recording made by PubSubRecorder")
+    arg_parser.add_argument(
+        "--speed",
+        type=float,
+        default=0,
+        help="1 = recorded speed, 2 = twice as fast, 0 = as fast as possible",
+    )
+    args = arg_parser.parse_args()
+    replay(args.filename, args.speed)
@@ -0,0 +1,278 @@
+# Run a day of mining in seconds: the miner components (Twitch, WebSocketsPool, streamers) talk with the fake backend
+# in process, the time is a VirtualClock. The same seed gives the same day (streams up / down, bonus claims, raids),
+# so the points per hour of two versions of the watch scheduling can be compared.
+# Usage: python -m benchmarks.simulate [--streamers 50] [--hours 24] [--seed 1] [--priority STREAK,DROPS,ORDER]
+
+import argparse
+import json
+import random
+import time
+from collections import Counter
+from urllib.parse import parse_qs, urlparse
+
+from benchmarks.fake_twitch import FakeTwitch, Scenario
+from benchmarks.fake_twitch.scenario import DEFAULT_RATES
+from benchmarks.pubsub_replay import StubWebSocket
+from TwitchChannelPointsMiner.classes.Clock import Clock
+from TwitchChannelPointsMiner.classes.DropsClaimer import DropsClaimer
+from TwitchChannelPointsMiner.classes.entities.Streamer import (
+    Streamer,
+    StreamerSettings,
+)
+from TwitchChannelPointsMiner.classes.RateLimiter import EndpointFamily
+from TwitchChannelPointsMiner.classes.Settings import Priority, Settings
+from TwitchChannelPointsMiner.classes.StreamersIndex import StreamersIndex
+from TwitchChannelPointsMiner.classes.Twitch import Twitch
+from TwitchChannelPointsMiner.classes.VirtualClock import VirtualClock
+from TwitchChannelPointsMiner.classes.WebSocketsPool import WebSocketsPool
+from TwitchChannelPointsMiner.constants.twitch import API, STATIC, URL, GQLOperations
+from TwitchChannelPointsMiner.logger import LoggerSettings
+
+# 2024-01-01 00:00:00 UTC, a fixed start keeps the timestamps of the messages repeatable
+START = 1704067200
+SPADE_URL = "https://spade.fake/track"
+# The fake backend doesn't limit the requests, the rate limiter must not slow down the virtual time
+RATE_LIMITS = {family: 1000 for family in EndpointFamily}
+
+
+class SimulatedResponse:
+    def __init__(self, status_code, body=None, text=""):
+        self.status_code = status_code
+        self.body = body
+        self.text = text
+        self.headers = {}
+
+    def json(self):
+        return self.body
+
+
+class SimulatedTransport:
+    """Replace the HttpClient of Twitch: each request is answered by the fake backend, no network access"""
+
+    def __init__(self, fake):
+        self.fake = fake
+        self.requests = Counter()
+
+    def mount(self, url, pool_maxsize=None):
+        pass
+
+    def request(self, method, url, **kwargs):
+        self.requests[urlparse(url).netloc] += 1
+        if url == GQLOperations.url:
+            operations = kwargs["json"]
+            if isinstance(operations, list):
+                return SimulatedResponse(
+                    200, [self.fake.gql(operation) for operation in operations]
+                )
+            return SimulatedResponse(200, self.fake.gql(operations))
+        if url.startswith(f"{API}/helix/"):
+            parsed = urlparse(url)
+            status, body = self.fake.helix(
+                parsed.path[len("/helix") :], parse_qs(parsed.query)
+            )
+            return SimulatedResponse(status, body)
+        if url == SPADE_URL:
+            valid = self.fake.minute_watched(kwargs["data"])
+            return SimulatedResponse(204 if valid is True else 400)
+        if url.startswith(f"{STATIC}/config/settings."):
+            return SimulatedResponse(
+                200, text=f'window.__twilightSettings = {{"spade_url":"{SPADE_URL}"}}'
+            )
+        if url.startswith(URL):
+            return SimulatedResponse(
+                200,
+                text=f'<html><script src="{STATIC}/config/settings.fake.js"></script></html>',
+            )
+        return SimulatedResponse(404, {"error": "Not Found", "status": 404})
+
+    def stats(self):
+        return dict(self.requests)
+
+    def close(self):
+        pass
+
+
+class SimulatedPubSub:
+    """Deliver the messages of the fake backend to WebSocketsPool.on_message, only for the listened topics"""
+
+    def __init__(self, pool, topics):
+        self.ws = StubWebSocket(pool)
+        self.topics = set(topics)
+        self.delivered = 0
+
+    def publish(self, topic, message):
+        if topic in self.topics:
+            self.delivered += 1
+            frame = {
+                "type": "MESSAGE",
+                "data": {"topic": topic, "message": json.dumps(message)},
+            }
+            WebSocketsPool.on_message(self.ws, json.dumps(frame))
+
+
+def gained_points(streamers):
+    gained = Counter()
+    for streamer in streamers:
+        for reason_code, history in streamer.history.items():
+            gained[reason_code] += history["amount"]
+    return gained
+
+
+def simulate(
+    streamers=50,
+    hours=24,
+    online=0.3,
+    seed=1,
+    priority=[Priority.STREAK, Priority.ORDER],
+):
+    clock = VirtualClock(start=START)
+    Clock.use(clock)
+
+    Settings.logger = LoggerSettings(save=False, less=True, emoji=False)
+    streamer_settings = StreamerSettings(make_predictions=False)
+    streamer_settings.default()
+    streamer_settings.bet.default()
+    Settings.streamer_settings = streamer_settings
+
+    fake = FakeTwitch(streamers=streamers, online=online, seed=seed)
+    # No browser, no predictions
+    scenario = Scenario(
+        fake,
+        rates={
+            name: rate for name, rate in DEFAULT_RATES.items() if name != "prediction"
+        },
+    )
+
+    twitch = Twitch(
+        fake.username,
+        "simulation",
+        rate_limits=RATE_LIMITS,
+        gql_workers=0,
+        drops_claimer_workers=0,
+    )
+    twitch.http = SimulatedTransport(fake)
+    # Nothing saved: the same seed must claim the same drops
+    twitch.drops_claimer = DropsClaimer(twitch.claim_drop, workers=0)
+    twitch.twitch_login.cookies = [
+        {"name": "auth-token", "value": "fake-auth-token"},
+        {"name": "persistent", "value": fake.user_id},
+    ]
+
+    started_at = time.perf_counter()
+    channel_ids = twitch.get_channel_ids([channel.login for channel in fake.channels])
+    streamers_index = StreamersIndex()
+    miner_streamers = []
+    for channel in fake.channels:
+        streamer = Streamer(channel.login, settings=streamer_settings)
+        streamer.channel_id = channel_ids[channel.login]
+        miner_streamers.append(streamer)
+        streamers_index.add(streamer)
+    chunk_size = max(1, twitch.gql_max_batch_size // 3)
+    for index in range(0, len(miner_streamers), chunk_size):
+        twitch.load_streamers_data(miner_streamers[index : index + chunk_size])
+    initial_points = sum(streamer.channel_points for streamer in miner_streamers)
+    twitch.load_drops_campaigns()
+
+    pool = WebSocketsPool(
+        twitch=twitch,
+        browser=None,
+        streamers=miner_streamers,
+        streamers_index=streamers_index,
+        events_predictions={},
+        dispatcher_workers=0,
+    )
+    user_id = twitch.twitch_login.get_user_id()
+    topics = [f"community-points-user-v1.{user_id}", f"user-drop-events.{user_id}"]
+    for streamer in miner_streamers:
+        topics += [
+            f"video-playback-by-id.{streamer.channel_id}",
+            f"raid.{streamer.channel_id}",
+        ]
+    pubsub = SimulatedPubSub(pool, topics)
+    fake.listeners.append(pubsub.publish)
+
+    clock.spawn(scenario.run, name="Scenario")
+    clock.spawn(
+        twitch.send_minute_watched_events,
+        miner_streamers,
+        priority,
+        name="MinuteWatched",
+    )
+
+    # Same loop of the miner
+    rng = random.Random(seed)
+    end = START + hours * 3600
+    hourly = []
+    next_hour = START + 3600
+    while Clock.time() < end:
+        Clock.sleep(rng.uniform(20, 60))
+        twitch.check_streamers_online(
+            [streamer for streamer in miner_streamers if streamer.is_online]
+        )
+        while Clock.time() >= next_hour and next_hour <= end:
+            hourly.append(sum(gained_points(miner_streamers).values()))
+            next_hour += 3600
+
+    twitch.running = False
+    scenario.stop()
+    clock.stop()
+    Clock.use(None)
+    elapsed = time.perf_counter() - started_at
+
+    gained = gained_points(miner_streamers)
+    total = sum(gained.values())
+    per_hour = [hourly[0]] + [b - a for a, b in zip(hourly, hourly[1:])]
+    print(f"Priority: {', '.join(item.name for item in priority)}")
+    print(
+        f"{streamers} streamers, {hours}h simulated in {elapsed:.1f}s ({hours * 3600 / elapsed:,.0f}x)"
+    )
+    print(
+        f"Points gained: {total:,} ({total / hours:,.0f}/h, min {min(per_hour):,}/h, max {max(per_hour):,}/h)"
+    )
+    print(
+        "By reason: "
+        + ", ".join(f"{reason} {amount:,}" for reason, amount in gained.most_common())
+    )
+    print(
+        f"Balance: {initial_points:,} -> {sum(streamer.channel_points for streamer in miner_streamers):,}"
+    )
+    print(
+        "Drops: "
+        + ", ".join(
+            f"{drop['id']} {drop['current']}/{drop['required']}{' claimed' if drop['claimed'] else ''}"
+            for drop in fake.drops
+        )
+    )
+    stats = twitch.refresh_coordinator.stats()
+    print(
+        f"Stream info refreshes: {stats['refreshed']:,} in {stats['batches']:,} batches, "
+        f"viewcount triggers: {stats['triggers']:,} ({stats['avoided']:,} avoided)"
+    )
+    print(
+        f"Minutes watched: {sum(channel.minutes_watched for channel in fake.channels):,}, "
+        f"PubSub messages: {pubsub.delivered:,}, requests: {dict(fake.requests)}"
+    )
+    return {"total": total, "per_hour": per_hour, "by_reason": dict(gained)}
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description="Virtual-clock mining simulation")
+    arg_parser.add_argument("--streamers", type=int, default=50)
+    arg_parser.add_argument("--hours", type=float, default=24)
+    arg_parser.add_argument(
+        "--online", type=float, default=0.3, help="Ratio of online streams at start"
+    )
+    arg_parser.add_argument("--seed", type=int, default=1)
+    arg_parser.add_argument(
+        "--priority",
+        default="STREAK,ORDER",
+        help=f"Chain of priorities, between {', '.join(item.name for item in Priority)}",
+    )
+    args = arg_parser.parse_args()
+    simulate(
+        streamers=args.streamers,
+        hours=args.hours,
+        online=args.online,
+        seed=args.seed,
+        priority=[Priority[item.strip()] for item in args.priority.split(",")],
+    )
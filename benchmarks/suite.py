@@ -0,0 +1,578 @@
+# Micro-benchmarks of the hot paths with regression thresholds (benchmarks/thresholds.json, max microseconds per operation).
+# The inputs are built from a fixed seed and each case reports the best of --repeat runs (garbage collector disabled),
+# so two runs on the same machine give close numbers. Exit code 1 if a case is slower than its threshold or fails.
+# Usage: python -m benchmarks.suite [--filter on_message] [--repeat 5] [--save results.json]
+#        python -m benchmarks.suite --write-thresholds 3  (threshold = 3 x the measured time, after a deliberate change)
+
+import argparse
+import gc
+import json
+import logging
+import os
+import random
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from dateutil import parser
+
+from benchmarks.pubsub_replay import StubBrowser, StubTwitch, StubWebSocket
+from TwitchChannelPointsMiner.classes.DedupCache import DedupCache
+from TwitchChannelPointsMiner.classes.entities.Bet import Bet, BetSettings, Strategy
+from TwitchChannelPointsMiner.classes.entities.EventPrediction import EventPrediction
+from TwitchChannelPointsMiner.classes.entities.Message import Message
+from TwitchChannelPointsMiner.classes.entities.Streamer import (
+    Streamer,
+    StreamerSettings,
+)
+from TwitchChannelPointsMiner.classes.Settings import Priority, Settings
+from TwitchChannelPointsMiner.classes.StreamersIndex import StreamersIndex
+from TwitchChannelPointsMiner.classes.WatchScheduler import WatchScheduler
+from TwitchChannelPointsMiner.classes.WebSocketsPool import WebSocketsPool
+from TwitchChannelPointsMiner.logger import EmojiFormatter, LoggerSettings
+from TwitchChannelPointsMiner.utils import get_streamer_index
+
+THRESHOLDS_FILE = os.path.join(os.path.dirname(__file__), "thresholds.json")
+SEED = 42
+USER_ID = "123456789"
+
+# name -> function returning (run, operations): run() executes `operations` times the code under test
+CASES = {}
+
+
+def case(name):
+    def register(function):
+        CASES[name] = function
+        return function
+
+    return register
+
+
+def build_streamers(count, rng, online=0.3):
+    settings = StreamerSettings(make_predictions=True)
+    settings.default()
+    settings.bet.default()
+    settings.bet.strategy = Strategy.SMART
+    streamers = []
+    for index in range(0, count):
+        streamer = Streamer(f"streamer{index:05d}", settings=settings)
+        streamer.channel_id = str(100000 + index)
+        streamer.channel_points = rng.randint(0, 100000)
+        if rng.random() < online:
+            streamer.is_online = True
+            streamer.online_at = 1
+            streamer.stream.watch_streak_missing = rng.random() < 0.5
+            streamer.stream.minute_watched = rng.randint(0, 10)
+        streamers.append(streamer)
+    return streamers
+
+
+def timestamp(seconds):
+    return (
+        (datetime(2024, 1, 1, tzinfo=timezone.utc) + timedelta(seconds=seconds))
+        .isoformat()
+        .replace("+00:00", "Z")
+    )
+
+
+def outcomes(rng):
+    return [
+        {
+            "id": str(uuid.UUID(int=rng.getrandbits(128))),
+            "color": color,
+            "title": title,
+            "total_points": rng.randint(1, 10**6),
+            "total_users": rng.randint(1, 10**4),
+            "top_predictors": [],
+            "badge": {"version": color.lower(), "set_id": "predictions"},
+        }
+        for color, title in [("BLUE", "Yes"), ("PINK", "No")]
+    ]
+
+
+# Nested message of each topic type, `index` makes the dedup key unique
+def pubsub_message(kind, index, channel_id, rng):
+    server_time = 1704067200 + index
+    if kind in ["viewcount", "viewcount (skipped)"]:
+        return (
+            "video-playback-by-id",
+            channel_id,
+            {
+                "type": "viewcount",
+                "server_time": server_time,
+                "viewers": rng.randint(1, 50000),
+            },
+        )
+    if kind in ["stream-up", "stream-down"]:
+        return (
+            "video-playback-by-id",
+            channel_id,
+            {
+                "type": kind,
+                "server_time": server_time,
+                "play_delay": 0,
+            },
+        )
+    if kind == "commercial (skipped)":
+        return (
+            "video-playback-by-id",
+            channel_id,
+            {
+                "type": "commercial",
+                "server_time": server_time,
+                "length": 90,
+            },
+        )
+    if kind == "points-earned":
+        return (
+            "community-points-user-v1",
+            USER_ID,
+            {
+                "type": "points-earned",
+                "data": {
+                    "timestamp": timestamp(index),
+                    "channel_id": channel_id,
+                    "point_gain": {
+                        "user_id": USER_ID,
+                        "channel_id": channel_id,
+                        "total_points": 10,
+                        "baseline_points": 10,
+                        "reason_code": "WATCH",
+                        "multipliers": [],
+                    },
+                    "balance": {
+                        "user_id": USER_ID,
+                        "channel_id": channel_id,
+                        "balance": rng.randint(0, 100000),
+                    },
+                },
+            },
+        )
+    if kind == "claim-available":
+        return (
+            "community-points-user-v1",
+            USER_ID,
+            {
+                "type": "claim-available",
+                "data": {
+                    "timestamp": timestamp(index),
+                    "claim": {
+                        "id": str(uuid.UUID(int=rng.getrandbits(128))),
+                        "user_id": USER_ID,
+                        "channel_id": channel_id,
+                        "point_gain": {"total_points": 50, "reason_code": "CLAIM"},
+                        "created_at": timestamp(index),
+                    },
+                },
+            },
+        )
+    if kind == "raid":
+        return (
+            "raid",
+            channel_id,
+            {
+                "type": "raid_update_v2",
+                "raid": {
+                    "id": str(uuid.UUID(int=rng.getrandbits(128))),
+                    "creator_id": channel_id,
+                    "source_id": channel_id,
+                    "target_id": "100000",
+                    "target_login": "streamer00000",
+                    "target_display_name": "streamer00000",
+                    "transition_jitter_seconds": 5,
+                    "force_raid_now_seconds": 90,
+                    "viewer_count": 100,
+                },
+            },
+        )
+    if kind in ["prediction event-created", "prediction event-updated"]:
+        return (
+            "predictions-channel-v1",
+            channel_id,
+            {
+                "type": kind.split(" ")[1],
+                "data": {
+                    "timestamp": timestamp(index),
+                    "event": {
+                        "id": str(uuid.UUID(int=rng.getrandbits(128))),
+                        "channel_id": channel_id,
+                        "created_at": timestamp(index),
+                        "title": "Benchmark prediction?",
+                        "status": "ACTIVE",
+                        "prediction_window_seconds": 120,
+                        "outcomes": outcomes(rng),
+                    },
+                },
+            },
+        )
+    if kind == "prediction-result":
+        return (
+            "predictions-user-v1",
+            USER_ID,
+            {
+                "type": "prediction-result",
+                "data": {
+                    "timestamp": timestamp(index),
+                    "prediction": {
+                        "event_id": str(uuid.UUID(int=rng.getrandbits(128))),
+                        "channel_id": channel_id,
+                        "result": {"type": "LOSE", "points_won": None},
+                    },
+                },
+            },
+        )
+    if kind == "drop-progress":
+        return (
+            "user-drop-events",
+            USER_ID,
+            {
+                "type": "drop-progress",
+                "data": {
+                    "drop_id": "drop-1",
+                    "channel_id": channel_id,
+                    "current_progress_min": 1,
+                    "required_progress_min": 60,
+                },
+            },
+        )
+    raise ValueError(kind)
+
+
+ON_MESSAGE_KINDS = [
+    "viewcount",
+    "viewcount (skipped)",
+    "commercial (skipped)",
+    "stream-up",
+    "stream-down",
+    "points-earned",
+    "claim-available",
+    "raid",
+    "prediction event-created",
+    "prediction event-updated",
+    "prediction-result",
+    "drop-progress",
+]
+
+
+def on_message_case(kind, count=2000):
+    def setup():
+        rng = random.Random(SEED)
+        streamers = build_streamers(1000, rng, online=0)
+        # The streamers of the skipped viewcount are online and refreshed,
+        # a new prediction is evaluated (bet_condition, start_bet) only on online streamers
+        if kind in ["viewcount (skipped)", "prediction event-created"]:
+            for streamer in streamers:
+                streamer.is_online = True
+                streamer.stream.update(None, "title", {}, [], 0)
+        pool = WebSocketsPool(
+            twitch=StubTwitch(),
+            browser=StubBrowser(),
+            streamers=streamers,
+            streamers_index=StreamersIndex(streamers),
+            events_predictions={},
+            dispatcher_workers=0,
+        )
+        ws = StubWebSocket(pool)
+        frames = []
+        for index in range(0, count):
+            topic, topic_user, message = pubsub_message(
+                kind, index, rng.choice(streamers).channel_id, rng
+            )
+            # The updates are applied to the events we are following
+            if kind == "prediction event-updated":
+                event = message["data"]["event"]
+                pool.events_predictions[event["id"]] = EventPrediction(
+                    pool.streamers_index.get_by_channel_id(event["channel_id"]),
+                    event["id"],
+                    event["title"],
+                    parser.parse(event["created_at"]),
+                    event["prediction_window_seconds"],
+                    event["status"],
+                    outcomes(rng),
+                )
+            frames.append(
+                json.dumps(
+                    {
+                        "type": "MESSAGE",
+                        "data": {
+                            "topic": f"{topic}.{topic_user}",
+                            "message": json.dumps(message),
+                        },
+                    }
+                )
+            )
+
+        def run():
+            # Same frames at each repeat: a new cache, otherwise they are dropped as duplicates
+            pool.dedup = DedupCache()
+            for frame in frames:
+                WebSocketsPool.on_message(ws, frame)
+
+        return run, count
+
+    return setup
+
+
+for kind in ON_MESSAGE_KINDS:
+    CASES[f"on_message[{kind}]"] = on_message_case(kind)
+
+
+@case("Message construction")
+def message_construction(count=20000):
+    rng = random.Random(SEED)
+    data = []
+    for index in range(0, count):
+        topic, topic_user, message = pubsub_message(
+            "points-earned", index, str(100000 + index % 1000), rng
+        )
+        data.append({"topic": f"{topic}.{topic_user}", "message": json.dumps(message)})
+
+    def run():
+        for item in data:
+            message = Message(item)
+            message.identifier
+            message.timestamp
+
+    return run, count
+
+
+def lookup_case(streamers_count, indexed, lookups):
+    def setup():
+        rng = random.Random(SEED)
+        streamers = build_streamers(streamers_count, rng)
+        streamers_index = StreamersIndex(streamers)
+        channel_ids = [rng.choice(streamers).channel_id for _ in range(0, lookups)]
+
+        def run():
+            for channel_id in channel_ids:
+                if indexed is True:
+                    streamers_index.get_by_channel_id(channel_id)
+                else:
+                    get_streamer_index(streamers, channel_id)
+
+        return run, lookups
+
+    return setup
+
+
+for streamers_count in [10, 100, 1000, 10000]:
+    CASES[f"get_streamer_index[{streamers_count}]"] = lookup_case(
+        streamers_count, False, max(10, 100000 // streamers_count)
+    )
+    CASES[f"StreamersIndex.get_by_channel_id[{streamers_count}]"] = lookup_case(
+        streamers_count, True, 10000
+    )
+
+
+@case("Bet.update_outcomes")
+def bet_update_outcomes(count=5000):
+    rng = random.Random(SEED)
+    bet = Bet(outcomes(rng), BetSettings())
+    updates = [outcomes(rng) for _ in range(0, count)]
+
+    def run():
+        for update in updates:
+            bet.update_outcomes(update)
+
+    return run, count
+
+
+@case("Bet.calculate")
+def bet_calculate(count=5000):
+    rng = random.Random(SEED)
+    bets = []
+    for index in range(0, count):
+        strategy = list(Strategy)[index % len(Strategy)]
+        bet = Bet(
+            outcomes(rng),
+            BetSettings(
+                strategy=strategy, percentage=5, percentage_gap=20, max_points=50000
+            ),
+        )
+        bet.update_outcomes(bet.outcomes)
+        bets.append((bet, rng.randint(0, 10**6)))
+
+    def run():
+        for bet, balance in bets:
+            bet.calculate(balance)
+
+    return run, count
+
+
+def encode_payload_case(cached, count=5000):
+    def setup():
+        streamers = build_streamers(count, random.Random(SEED))
+        payloads = [
+            [
+                {
+                    "event": "minute-watched",
+                    "properties": {
+                        "channel_id": streamer.channel_id,
+                        "broadcast_id": str(40000000000 + index),
+                        "player": "site",
+                        "user_id": int(USER_ID),
+                        "game": "Just Chatting",
+                    },
+                }
+            ]
+            for index, streamer in enumerate(streamers)
+        ]
+        for streamer, payload in zip(streamers, payloads):
+            streamer.stream.payload = payload
+            streamer.stream.encode_payload()
+
+        def run():
+            for streamer, payload in zip(streamers, payloads):
+                if cached is False:
+                    # A new payload (update_stream) invalidates the encoded one
+                    streamer.stream.payload = payload
+                streamer.stream.encode_payload()
+
+        return run, count
+
+    return setup
+
+
+CASES["Stream.encode_payload[cold]"] = encode_payload_case(False)
+CASES["Stream.encode_payload[cached]"] = encode_payload_case(True)
+
+
+def emoji_formatter_case(print_emoji, count=5000):
+    def setup():
+        formatter = EmojiFormatter(
+            fmt="%(asctime)s - %(levelname)s - [%(funcName)s]: %(message)s",
+            datefmt="%d/%m/%y %H:%M:%S",
+            print_emoji=print_emoji,
+        )
+
+        def run():
+            # format() changes the record, a new one for each call (included in the time)
+            for index in range(0, count):
+                record = logging.makeLogRecord(
+                    {
+                        "msg": f"+10 → streamer{index:05d} (12.34k points) - Reason: WATCH.",
+                        "levelname": "INFO",
+                        "levelno": logging.INFO,
+                        "funcName": "process_message",
+                        "emoji": ":rocket:",
+                    }
+                )
+                formatter.format(record)
+
+        return run, count
+
+    return setup
+
+
+CASES["EmojiFormatter.format[emoji]"] = emoji_formatter_case(True)
+CASES["EmojiFormatter.format[no emoji]"] = emoji_formatter_case(False)
+
+
+# One minute of send_minute_watched_events: pick the streamers, then update them after the minute watched
+def watch_scheduler_case(streamers_count, count=10000):
+    def setup():
+        streamers = build_streamers(streamers_count, random.Random(SEED))
+        scheduler = WatchScheduler(
+            [Priority.STREAK, Priority.SUBSCRIBED, Priority.POINTS_ASCENDING]
+        )
+        for streamer in streamers:
+            scheduler.add(streamer)
+
+        def run():
+            for _ in range(0, count):
+                for streamer in scheduler.next():
+                    scheduler.update(streamer)
+
+        return run, count
+
+    return setup
+
+
+for streamers_count in [100, 1000, 10000]:
+    CASES[f"WatchScheduler.next[{streamers_count}]"] = watch_scheduler_case(
+        streamers_count
+    )
+
+
+# Best time of `repeat` runs, microseconds per operation
+def measure(setup, repeat):
+    run, operations = setup()
+    run()  # Warm-up
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        best = None
+        for _ in range(0, repeat):
+            start = time.perf_counter()
+            run()
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+    finally:
+        if gc_enabled is True:
+            gc.enable()
+    return best / operations * 1e6
+
+
+def load_thresholds():
+    if os.path.isfile(THRESHOLDS_FILE) is False:
+        return {}
+    with open(THRESHOLDS_FILE, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def run_suite(filter=None, repeat=5):
+    # Only the warnings, the handlers log each message at INFO level
+    logging.getLogger("TwitchChannelPointsMiner").setLevel(logging.WARNING)
+    Settings.logger = LoggerSettings(save=False, less=True, emoji=False)
+    thresholds = load_thresholds()
+
+    results, failures = {}, []
+    for name, setup in CASES.items():
+        if filter is not None and filter not in name:
+            continue
+        try:
+            result = measure(setup, repeat)
+        except Exception as e:
+            failures.append(name)
+            print(f"{name:<48} ERROR {type(e).__name__}: {e}")
+            continue
+        results[name] = round(result, 3)
+        threshold = thresholds.get(name)
+        status = ""
+        if threshold is not None:
+            status = f"(max {threshold})"
+            if result > threshold:
+                failures.append(name)
+                status += " REGRESSION"
+        print(f"{name:<48} {result:>12.3f} us/op {status}")
+    return results, failures
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description="Hot paths benchmark suite")
+    arg_parser.add_argument("--filter", default=None, help="Only the matching cases")
+    arg_parser.add_argument("--repeat", type=int, default=5)
+    arg_parser.add_argument("--save", default=None, help="Write the results (JSON)")
+    arg_parser.add_argument(
+        "--write-thresholds",
+        type=float,
+        default=None,
+        metavar="FACTOR",
+        help="Set the thresholds of the measured cases to FACTOR x the result",
+    )
+    args = arg_parser.parse_args()
+
+    results, failures = run_suite(args.filter, args.repeat)
+    if args.save is not None:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    if args.write_thresholds is not None:
+        thresholds = load_thresholds()
+        for name, result in results.items():
+            thresholds[name] = float(f"{result * args.write_thresholds:.3g}")
+        with open(THRESHOLDS_FILE, "w", encoding="utf-8") as f:
+            json.dump(thresholds, f, indent=2)
+            f.write("\n")
+    elif failures != []:
+        print(f"{len(failures)} failed: {', '.join(failures)}")
+        raise SystemExit(1)
@@ -5,11 +5,19 @@ from TwitchChannelPointsMiner import TwitchChannelPointsMiner
 from TwitchChannelPointsMiner.logger import LoggerSettings
 from TwitchChannelPointsMiner.classes.entities.Bet import Strategy, BetSettings
 from TwitchChannelPointsMiner.classes.entities.Streamer import Streamer, StreamerSettings
+from TwitchChannelPointsMiner.classes.RateLimiter import EndpointFamily
+from TwitchChannelPointsMiner.classes.Settings import Priority
 from TwitchChannelPointsMiner.classes.TwitchBrowser import Browser, BrowserSettings
 
 twitch_miner = TwitchChannelPointsMiner(
     username="your-twitch-username",
     claim_drops_startup=False,          # If you want to auto claim all drops from Twitch inventory on startup
+    priority=[Priority.STREAK, Priority.DROPS, Priority.ORDER],  # Custom priority for choose the 2 streamers to watch (see Limits)
+    pubsub_recorder=None,               # Filename (.gz for compressed) where the raw PubSub traffic is recorded, for debug / benchmarks/pubsub_replay.py
+    spade_url_ttl=3600,                 # Seconds before the spade url (minute watched endpoint) is discovered again
+    gql_max_batch_size=30,              # Max GQL operations sent in a single (batched) request
+    rate_limits={EndpointFamily.GQL: 10, EndpointFamily.HELIX: 800 / 60, EndpointFamily.SPADE: 5},  # Requests per second by endpoint family, the missing ones keep the default
+    gql_workers=4,                      # Threads that send the GQL requests, served by priority (claims first)
     logger_settings=LoggerSettings(
         save=True,                      # If you want to save logs in file (suggested)
         console_level=logging.INFO,     # Level of logs - use logging.DEBUG for more info)
@@ -23,7 +23,7 @@ setuptools.setup(
     license="GPLv3+",
     keywords="python bot streaming script miner twtich channel-points",
     url="https://github.com/Tkd-Alex/Twitch-Channel-Points-Miner-v2",
-    packages=setuptools.find_packages(),
+    packages=setuptools.find_packages(exclude=("benchmarks", "benchmarks.*")),
     include_package_data=True,
     install_requires=read("requirements.txt").splitlines(),
     long_description=read("README.md"),